@@ -7,43 +7,11 @@ After getting results from SNAP or Graph-tool, the clusterExecutor will transfor
 import snap
 import time
 import os
+import resultWriter
+from graphCreator import graphCreator
+import graphCache
 import graph_tool.all as gt
 
-#graphCreator for graph=tool
-class graphCreator():
-    def __init__(self, graphTxtName, isDirected):
-        f = open(graphTxtName)
-        self.idIndexDict = dict()
-        self.indexIdDict = dict()
-        self.g = gt.Graph(directed= isDirected)
-        index = 0
-        edge_list = []
-        for each in f:
-            if each.startswith("#"):
-                continue            
-            strPair = each.strip().split()
-            sourceId = int(strPair[0])
-            targetId = int(strPair[1])
-            if sourceId not in self.idIndexDict:   
-                self.g.add_vertex()
-                self.idIndexDict[sourceId] = index
-                self.indexIdDict[index] = sourceId
-                index += 1
-            if targetId not in self.idIndexDict:
-                self.g.add_vertex()
-                self.idIndexDict[targetId] =  index
-                self.indexIdDict[index] = targetId
-                index += 1
-                
-            if ((sourceId, targetId) not in edge_list):
-                if (isDirected == False):
-                    edge_list.append((sourceId, targetId))
-                    edge_list.append((targetId, sourceId))
-                    self.g.add_edge(self.g.vertex(self.idIndexDict[sourceId]), self.g.vertex(self.idIndexDict[targetId]))
-                else:
-                    edge_list.append((sourceId, targetId))
-                    self.g.add_edge(self.g.vertex(self.idIndexDict[sourceId]), self.g.vertex(self.idIndexDict[targetId]))
-                    
 #based on the algorithms, choose different methods to run the operations
 def processCommand(clusterCommands, conn, cur):
     graphPath = getGraph(clusterCommands[0])
@@ -52,6 +20,7 @@ def processCommand(clusterCommands, conn, cur):
     #Determine measurement   
     if "gn" == algorithmName:
         if "ungraph" == clusterCommands[2].lower().strip():
+            #GN removes the edges of the graph, so it does not use a graph from the cache
             Graph = snap.LoadEdgeList(snap.PUNGraph, graphPath, 0, 1)
             
         else:
@@ -61,7 +30,7 @@ def processCommand(clusterCommands, conn, cur):
         
     elif "cnm" == algorithmName:
         if "ungraph" == clusterCommands[2].lower().strip():
-            Graph = snap.LoadEdgeList(snap.PUNGraph, graphPath, 0, 1)
+            Graph = snapCreateGraph(clusterCommands)
             
         else:
             raise RuntimeError, "Grapy Type Error: CNM algorithm only support ungraph!" 
@@ -87,22 +56,22 @@ def processCommand(clusterCommands, conn, cur):
 def snapCreateGraph(clusterCommands):
     graphPath = getGraph(clusterCommands[0])
     if "digraph" in clusterCommands[2].lower().strip():
-        Graph = snap.LoadEdgeList(snap.PNGraph, graphPath, 0, 1)
+        Graph = graphCache.loadGraph(clusterCommands[0], graphPath, "snap_digraph", lambda path: snap.LoadEdgeList(snap.PNGraph, path, 0, 1))
         return Graph
         
     elif "ungraph" in clusterCommands[2].lower().strip():
-        Graph = snap.LoadEdgeList(snap.PUNGraph, graphPath, 0, 1)
+        Graph = graphCache.loadGraph(clusterCommands[0], graphPath, "snap_ungraph", lambda path: snap.LoadEdgeList(snap.PUNGraph, path, 0, 1))
         return Graph
     
 #create a graph using graphTool   
 def gtCreateGraph(clusterCommands):
     graphPath = getGraph(clusterCommands[0])
     if "digraph" in clusterCommands[2].lower().strip():
-        Graph = graphCreator(graphPath, True)
+        Graph = graphCache.loadGraph(clusterCommands[0], graphPath, "graphtool_digraph", lambda path: graphCreator(path, True))
         return Graph
         
     elif "ungraph" in clusterCommands[2].lower().strip():
-        Graph = graphCreator(graphPath, False)
+        Graph = graphCache.loadGraph(clusterCommands[0], graphPath, "graphtool_ungraph", lambda path: graphCreator(path, False))
         return Graph 
     
 #using snap to implement the community detection algorithm (GN or CNM) 
@@ -141,11 +110,8 @@ def blockModel(clusterCommands, Graph, conn, cur):
     commDict = []
     for i in range(maxCommID+1):
         commDict.append([])
-    index = 0
-    for each in values:
-        nodeID = Graph.indexIdDict[index]
+    for nodeID, each in zip(Graph.indexId.tolist(), values.tolist()):
         commDict[each].append(nodeID)
-        index += 1
     createTable(clusterCommands, commDict, conn, cur)
 
 #get the graph from materialised graph dir or tmp graph dir
@@ -169,16 +135,11 @@ def createTable(clusterCommands, CmtyV, conn, cur):
     Col3= "Members"
     
     #print "create temp table " + tableName + " (" + Col1 + " int not null primary key, " + Col2 + " int[]);"
-    cur.execute("create temp table " + tableName + " (" + Col1 + " int not null primary key, " + Col2 + " int, " + Col3 + " int[]);")
-    conn.commit()
+    writer = resultWriter.tableWriter(tableName, [(Col1, "int not null"), (Col2, "int"), (Col3, "int[]")], Col1, conn, cur)
     
     communityId = 0
     for Cmty in CmtyV:
         communityId += 1
-        membersId = ""
-        size = len(Cmty)
-        for NI in Cmty:
-            membersId += str(NI) + ","
-            
-        cur.execute("INSERT INTO " + tableName + " VALUES(%s, %s, %s)" % (communityId, size,"'{" + membersId[:-1] + "}'"))
-        conn.commit()
\ No newline at end of file
+        membersId = [NI for NI in Cmty]
+        writer.writeRow((communityId, len(membersId), membersId))
+    writer.close()
\ No newline at end of file
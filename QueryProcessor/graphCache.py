@@ -0,0 +1,64 @@
+'''
+The graphCache is to keep the graphs loaded by the rankExecutor, clusterExecutor and pathExecutor in memory,
+so that a query (or the next one) using the same graph with the same library does not parse the graph file again.
+Graphs are keyed by their name, the version of their graph file and their representation (library and graph type),
+and the least recently used ones are evicted when the graphs in the cache go over the memory budget.
+
+@author: minjian
+'''
+import os
+from collections import OrderedDict
+
+#memory budget of the cache in bytes
+MEMORY_BUDGET = 2 << 30
+#memory taken by a loaded graph, estimated as a multiple of the size of its graph file
+MEMORY_FACTOR = {"snap": 4, "graphtool": 6, "networkx": 40}
+
+#(graphName, version, representation) -> (graph, memory), from least to most recently used
+cachedGraphs = OrderedDict()
+usedMemory = [0]
+
+#returns the graph of a graph file in a representation like "snap_digraph", loaded by loader(graphPath)
+#if it is not in the cache. A graph file that is written again gets a new version, so it is loaded again
+def loadGraph(graphName, graphPath, representation, loader):
+    version = getVersion(graphPath)
+    key = (graphName, version, representation)
+    if key in cachedGraphs:
+        entry = cachedGraphs.pop(key)
+        cachedGraphs[key] = entry  #now the most recently used
+        return entry[0]
+
+    #older versions of this graph are never used again
+    for each in cachedGraphs.keys():
+        if each[0] == graphName and each[2] == representation:
+            removeGraph(each)
+
+    graph = loader(graphPath)
+    memory = version[2] * MEMORY_FACTOR.get(representation.split("_")[0], 40)
+    if memory <= MEMORY_BUDGET:
+        while usedMemory[0] + memory > MEMORY_BUDGET:
+            removeGraph(next(iter(cachedGraphs)))
+        cachedGraphs[key] = (graph, memory)
+        usedMemory[0] += memory
+    return graph
+
+#the version of a graph file: a file written again changes its modification time or size
+def getVersion(graphPath):
+    info = os.stat(graphPath)
+    return (graphPath, info.st_ino, info.st_size, info.st_mtime)
+
+#removes a graph from the cache
+def removeGraph(key):
+    graph, memory = cachedGraphs.pop(key)
+    usedMemory[0] -= memory
+
+#removes the graphs whose graph files are in a directory, e.g. once the graphs on-the-fly are deleted
+def removeGraphsIn(graphDir):
+    for each in cachedGraphs.keys():
+        if each[1][0].startswith(graphDir):
+            removeGraph(each)
+
+#removes all the graphs from the cache
+def clear():
+    cachedGraphs.clear()
+    usedMemory[0] = 0
@@ -0,0 +1,46 @@
+'''
+The graphCreator is to build Graph-tool graphs from the graph files for the rankExecutor and the clusterExecutor.
+The edge file is read into NumPy arrays, the vertex ids are renamed to indices 0..n-1 and the parallel edges are
+removed by sorting, and the edges are added to the graph in one call.
+
+@author: minjian
+'''
+import numpy
+import graph_tool.all as gt
+
+#graphCreator for graph=tool
+class graphCreator():
+    #indexId is an array that gives the id of each vertex index, sorted by id
+    def __init__(self, graphTxtName, isDirected):
+        sourceIds, targetIds = readEdges(graphTxtName)
+        self.indexId, indices = numpy.unique(numpy.concatenate((sourceIds, targetIds)), return_inverse=True)
+        n = len(self.indexId)
+        sources = indices[:len(sourceIds)].astype(numpy.int64)
+        targets = indices[len(sourceIds):].astype(numpy.int64)
+
+        #an undirected edge is kept once, whatever its direction
+        if isDirected == False:
+            sources, targets = numpy.minimum(sources, targets), numpy.maximum(sources, targets)
+        keys = numpy.unique(sources * n + targets)
+
+        self.g = gt.Graph(directed= isDirected)
+        self.g.add_vertex(n)
+        self.g.add_edge_list(numpy.column_stack((keys // max(n, 1), keys % max(n, 1))))
+
+#reads the first two columns of an edge file into two arrays, skipping lines starting with "#"
+def readEdges(graphTxtName):
+    f = open(graphTxtName)
+    text = f.read()
+    f.close()
+
+    #fast path for files without comments and with the same number of columns on every line
+    lines = text.count('\n') + (len(text) > 0 and not text.endswith('\n'))
+    columns = len(text[:text.find('\n')].split())
+    if '#' not in text and columns >= 2:
+        values = numpy.fromstring(text, dtype=numpy.int64, sep=' ')
+        if len(values) == lines * columns:
+            values = values.reshape(lines, columns)
+            return values[:, 0].copy(), values[:, 1].copy()
+
+    values = numpy.loadtxt(graphTxtName, dtype=numpy.int64, comments='#', usecols=(0, 1)).reshape(-1, 2)
+    return values[:, 0].copy(), values[:, 1].copy()
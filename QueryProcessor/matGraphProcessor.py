@@ -8,20 +8,29 @@ import os
 def processCommand(executeCommand, conn ,cur):
     lowerCaseCommand = executeCommand.lower()
     
-    cur.execute("select * from pg_tables where tablename = 'my_matgraphs';")
-    rows = cur.fetchall()
+    createCatalog(conn, cur)
     
-    #create the system catalog about materialised graphs
-    if len(rows) == 0:
-        cur.execute("create table my_matgraphs (matgraphname text primary key, graphType text);")
-    conn.commit()
+    if lowerCaseCommand.strip().startswith("refresh"): #refresh a materialized graph
+        for keyword in ["ungraph", "digraph", "materialized view"]:
+            if keyword in lowerCaseCommand:
+                sIndex = lowerCaseCommand.index(keyword)+len(keyword)
+                break
+        names = lowerCaseCommand[sIndex:].replace(";", " ").split()
+        if names[0] == "concurrently":
+            names = names[1:]
+        graphName = names[0]
+        #the new version is committed together with the refresh by the queryConsole
+        newGraphVersion(graphName, cur)
+        for keyword in ["ungraph", "UNGRAPH", "digraph", "DIGRAPH"]:
+            executeCommand = executeCommand.replace(keyword, "materialized view")
+        return executeCommand
     
-    if "create" in lowerCaseCommand: #create a materialized graph
+    elif "create" in lowerCaseCommand: #create a materialized graph
         if "ungraph" in lowerCaseCommand:
             sIndex = lowerCaseCommand.index("ungraph")+len("ungraph")
             eIndex = lowerCaseCommand.index("as")
             graphName = lowerCaseCommand[sIndex:eIndex].strip()
-            cur.execute("INSERT INTO my_matgraphs VALUES(%s, %s)" % ("'" + graphName + "'", "'ungraph'"))
+            cur.execute("INSERT INTO my_matgraphs VALUES(%s, %s, txid_current()::text)" % ("'" + graphName + "'", "'ungraph'"))
             conn.commit()
             if executeCommand.find("ungraph") != -1:  
                 return executeCommand.replace("ungraph", "materialized view")
@@ -35,7 +44,7 @@ def processCommand(executeCommand, conn ,cur):
             sIndex = lowerCaseCommand.index("digraph")+len("digraph")
             eIndex = lowerCaseCommand.index("as")
             graphName = lowerCaseCommand[sIndex:eIndex].strip()
-            cur.execute("INSERT INTO my_matgraphs VALUES(%s, %s)" % ("'" + graphName + "'", "'digraph'"))
+            cur.execute("INSERT INTO my_matgraphs VALUES(%s, %s, txid_current()::text)" % ("'" + graphName + "'", "'digraph'"))
             conn.commit()
             if executeCommand.find("digraph") != -1:  
                 return executeCommand.replace("digraph", "materialized view")
@@ -50,12 +59,54 @@ def processCommand(executeCommand, conn ,cur):
             graphName = lowerCaseCommand[sIndex:eIndex].strip() 
             cur.execute("DELETE FROM my_matgraphs where matgraphname = %s" % ("'" + graphName + "'"))
             conn.commit()
+            #remove the exported graph file with the CSR cache and the kECC index built next to it
+            graphPath = os.environ['HOME']  + "/RG_Mat_Graph/" + graphName
+            os.system("rm -fr " + graphPath + " " + graphPath + ".csr " + graphPath + ".kecc")
             if executeCommand.find("ungraph") != -1 or executeCommand.find("UNGRAPH") != -1:  
                 return (executeCommand.replace("ungraph", "materialized view")).replace("UNGRAPH", "materialized view")
             elif executeCommand.find("digraph") != -1 or executeCommand.find("DIGRAPH") != -1:  
                 return (executeCommand.replace("digraph", "materialized view")).replace("DIGRAPH", "materialized view")
             else:
-                raise RuntimeError, "Graph type is not correct." 
-            graphPath = os.environ['HOME']  + "/RG_Mat_Graph/" + graphName
-            os.system("rm -fr " + graphPath)
-    
\ No newline at end of file
+                raise RuntimeError, "Graph type is not correct."
+
+#creates the system catalog about materialised graphs. Besides the graph type, it keeps the
+#version of the view, which is changed whenever the view is created or refreshed, and the stamp
+#of the graph file it was last exported to. These columns are added to catalogs created without them
+def createCatalog(conn, cur):
+    cur.execute("select * from pg_tables where tablename = 'my_matgraphs';")
+    rows = cur.fetchall()
+    if len(rows) == 0:
+        cur.execute("create table my_matgraphs (matgraphname text primary key, graphType text, version text, fileStamp text);")
+    else:
+        cur.execute("select column_name from information_schema.columns where table_name = 'my_matgraphs';")
+        columns = [row[0] for row in cur.fetchall()]
+        if "version" not in columns:
+            cur.execute("alter table my_matgraphs add column version text;")
+        if "filestamp" not in columns:
+            cur.execute("alter table my_matgraphs add column fileStamp text;")
+    conn.commit()
+
+#gives the materialized view of a graph a new version, the id of the current transaction, and
+#returns it. It is done in the transaction of the refresh, so both are committed together
+def newGraphVersion(graphName, cur):
+    cur.execute("update my_matgraphs set version = txid_current()::text where matgraphname = '%s' returning version;" % (graphName))
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return row[0]
+
+#returns a token of the current contents of the materialized view of a graph, kept by the server: the
+#file node of the view, which a refresh replaces, with the number of rows inserted, updated and deleted
+#in it, which a concurrent refresh changes. So refreshes that do not go through the queryConsole change it too
+def getViewToken(graphName, cur):
+    cur.execute("select pg_relation_filenode(c.oid), coalesce(s.n_tup_ins + s.n_tup_upd + s.n_tup_del, 0) from pg_class c left join pg_stat_all_tables s on s.relid = c.oid where c.oid = '%s'::regclass;" % (graphName))
+    row = cur.fetchone()
+    return "%s:%s" % (row[0], row[1])
+
+#returns the stamp of a graph file exported from a version of its view: the version and the token
+#of the view with the size and the modification time of the file, or None if the file does not exist
+def getFileStamp(graphPath, version, viewToken):
+    if os.path.exists(graphPath) == False:
+        return None
+    info = os.stat(graphPath)
+    return "%s:%s:%d:%r" % (version, viewToken, info.st_size, info.st_mtime)
@@ -7,6 +7,8 @@ After getting results from NetworkX, the pathExecutor will transform the results
 import networkx as nx
 import os
 import queryParser
+import resultWriter
+import graphCache
 
 #based on the path expression, choose different methods to run the operations
 def processCommand(pathCommands, conn ,cur):
@@ -14,10 +16,10 @@ def processCommand(pathCommands, conn ,cur):
     #createGraph
     graphPath = getGraph(pathCommands[0])
     if "digraph" == pathCommands[2].strip():
-        Graph = createGraph(graphPath, "digraph")
+        Graph = graphCache.loadGraph(pathCommands[0], graphPath, "networkx_digraph", lambda path: createGraph(path, "digraph"))
         
     elif "ungraph" == pathCommands[2].strip():
-        Graph = createGraph(graphPath, "ungraph")
+        Graph = graphCache.loadGraph(pathCommands[0], graphPath, "networkx_ungraph", lambda path: createGraph(path, "ungraph"))
     
         
     #differentiate V1//V2 and V1/./V2
@@ -114,8 +116,7 @@ def createTable(pathCommands, Graph, srcRows, desRows, pathLen, conn, cur):
     Col3 = "Paths"
         
     #print "create temp table " + graphCommand[3] + " (" + graphCommand[1] + " int not null primary key, " + graphCommand[2] + " int);"
-    cur.execute("create temp table " + tableName + " (" + Col1 + " int not null primary key, " + Col2 + " int , " + Col3 + " integer[] );")
-    conn.commit()
+    writer = resultWriter.tableWriter(tableName, [(Col1, "int not null"), (Col2, "int"), (Col3, "integer[]")], Col1, conn, cur)
     
     pathId = 0
     for i in range(0,len(srcRows)):
@@ -130,9 +131,9 @@ def createTable(pathCommands, Graph, srcRows, desRows, pathLen, conn, cur):
                 for path in pathList:
                     pathId += 1
                     #print path, len(path)-1
-                    cur.execute("INSERT INTO " + tableName + " VALUES(%s, %s, array %s)" % (pathId, len(path)-1, path))
+                    writer.writeRow((pathId, len(path)-1, path))
                     #cur.execute("UPDATE " + tableName + " SET %s = %s || ARRAY[1,2,3,4] WHERE %s = %s" % (Col3, Col3, Col1, pathId))
-                    conn.commit()
+    writer.close()
     print "complete the paths temp table"  
 
 #create temp table in the relational DB to store the results (with middle node conditions, e.g. V1/.V2/.V3)        
@@ -151,8 +152,7 @@ def createMTable(pathCommands, Graph, columnList, pathLenList, conn, cur):
     Col3 = "Path"
         
     #print "create temp table " + graphCommand[3] + " (" + graphCommand[1] + " int not null primary key, " + graphCommand[2] + " int);"
-    cur.execute("create temp table " + tableName + " (" + Col1 + " int not null primary key, " + Col2 + " int , " + Col3 + " integer[] );")
-    conn.commit()
+    writer = resultWriter.tableWriter(tableName, [(Col1, "int not null"), (Col2, "int"), (Col3, "integer[]")], Col1, conn, cur)
     
     pathId = 0
     srcCols = columnList[-1]
@@ -194,18 +194,16 @@ def createMTable(pathCommands, Graph, columnList, pathLenList, conn, cur):
                                                 pathId += 1
                                                 cpPath = path[:]
                                                 cpPath.extend(lastPath[1:])
-                                                cur.execute("INSERT INTO " + tableName + " VALUES(%s, %s, array %s)" % (pathId, len(cpPath)-1, cpPath))
+                                                writer.writeRow((pathId, len(cpPath)-1, cpPath))
                                                 #cur.execute("UPDATE " + tableName + " SET %s = %s || ARRAY%s WHERE %s = %s" % (Col3, Col3, path[1:], Col1, pathId))
                                                 #cur.execute("UPDATE " + tableName + " SET %s = %s + %s WHERE %s = %s" % (Col2, Col2, pathLenList[pl], Col1, pathId))
-                                                conn.commit()
                                         else:
                                             for each in tempPathList:
                                                 for lastPath in lastPathList:
                                                     pathId += 1
                                                     cpPath = each[:]
                                                     cpPath.extend(lastPath[1:])
-                                                    cur.execute("INSERT INTO " + tableName + " VALUES(%s, %s, array %s)" % (pathId, len(cpPath)-1, cpPath))
-                                                    conn.commit()
+                                                    writer.writeRow((pathId, len(cpPath)-1, cpPath))
                         
                         #Here is the paths between first path and last path
                         #We only expand the result list and store the new results into a tempPathList
@@ -233,6 +231,7 @@ def createMTable(pathCommands, Graph, columnList, pathLenList, conn, cur):
                                                     cpPath = each[:]
                                                     cpPath.extend(conPath[1:])
                                                     tempPathList.append(cpPath)
+    writer.close()
     print "complete the paths temp Mtable"  
 
 
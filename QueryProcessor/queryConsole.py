@@ -7,6 +7,7 @@ The queryConsole is to read the query input, show query results and display erro
 import psycopg2
 import queryParser
 import matGraphProcessor
+import graphCache
 import time
 import os
 from Tkinter import * #GUI package
@@ -27,8 +28,10 @@ def execQuery(conn, cur, executeCommand, result_Text):
         cur.execute(newExecuteCommand[:]) #remove the first space
         printResult(conn, cur, result_Text)
     
-    #query about creating or dropping a materialised graph    
-    elif ("create" in lowerCaseCommand or "drop" in lowerCaseCommand) and ("ungraph" in lowerCaseCommand or "digraph" in lowerCaseCommand):
+    #query about creating, dropping or refreshing a materialised graph; refreshing the materialized
+    #view of a graph gives the graph a new version as well
+    elif (("create" in lowerCaseCommand or "drop" in lowerCaseCommand or "refresh" in lowerCaseCommand) and ("ungraph" in lowerCaseCommand or "digraph" in lowerCaseCommand)) \
+            or (lowerCaseCommand.strip().startswith("refresh") and "materialized view" in lowerCaseCommand):
         newExecuteCommand = matGraphProcessor.processCommand(executeCommand, conn, cur)
         eIndex = newExecuteCommand.index("view")
         cur.execute(newExecuteCommand[:]) #remove the first space
@@ -122,6 +125,7 @@ def start(query, result_Text):
         execQuery(conn, cur, query, result_Text)
         #print "Total query time is: ", (time.time() - start_time)
         os.system("rm -fr /dev/shm/RG_Tmp_Graph/*")  #clear graphs on-the-fly
+        graphCache.removeGraphsIn("/dev/shm/RG_Tmp_Graph/")  #and their loaded graphs
         queryParser.graphQueryAndResult.clear()  #clear parser's dictionary for result table names and graph sub-queries
     except psycopg2.ProgrammingError as reason:
         result_Text.insert(INSERT, str(reason))
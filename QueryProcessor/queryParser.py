@@ -11,7 +11,10 @@ import os
 import rankExecutor as rExe
 import clusterExecutor as cExe
 import pathExecutor as pExe
+import matGraphProcessor as mGP
 import time
+#size of the blocks read from COPY when a graph is exported
+COPY_BUFFER_SIZE = 1 << 20
 #this array is used to store each function and its related result table name
 graphQueryAndResult = dict()
 
@@ -125,15 +128,7 @@ def getGQueryInfo(executeCommand, graphIndex, conn, cur):
         gQueryInfo.append(graphInfo[1]) #graph type
         
         if len(graphInfo) == 3:  #info about creating graph
-            graphFile = open(tmpGraphDir + graphInfo[0], 'w')
-            cur.execute(graphInfo[2] + ";")
-            conn.commit()
-            rows = cur.fetchall()
-            startW_time = time.time()
-            for i in rows:
-                graphFile.write(str(i[0]) + '\t' + str(i[1]) + os.linesep)
-            graphFile.close() 
-            print "Graph writing time: ", time.time() - startW_time   
+            exportGraph(graphInfo[2], tmpGraphDir + graphInfo[0], conn, cur)
         else:
             raise RuntimeError, "Error about creating Graph on-the-fly!!"        
         
@@ -156,20 +151,26 @@ def getGQueryInfo(executeCommand, graphIndex, conn, cur):
         conn.commit()
         rows = cur.fetchall()
         if len(rows) == 1: #find the mat_graph
-            cur.execute("select graphType from my_matgraphs where matgraphname = '%s';" % (graphName))
+            mGP.createCatalog(conn, cur)
+            cur.execute("select graphType, version, fileStamp from my_matgraphs where matgraphname = '%s';" % (graphName))
             conn.commit()
             myrow = cur.fetchone()
             gQueryInfo.append(myrow[0]) #get graph Type
             
-            graphFile = open(matGraphDir + graphName, 'w')
-            cur.execute("select * from %s;" % (graphName))
-            conn.commit()
-            rows = cur.fetchall()
-            startW_time = time.time()
-            for i in rows:
-                graphFile.write(str(i[0]) + '\t' + str(i[1]) + os.linesep)
-            graphFile.close()     
-            print "Graph writing time: ", time.time() - startW_time 
+            #export the graph only if the view has been refreshed since the last export, or if the
+            #file has been changed or removed since then
+            graphPath = matGraphDir + graphName
+            version = myrow[1]
+            viewToken = mGP.getViewToken(graphName, cur)
+            if version is not None and myrow[2] == mGP.getFileStamp(graphPath, version, viewToken):
+                print "Graph file is up to date"
+            else:
+                if version is None: #graphs created before versions were kept
+                    version = mGP.newGraphVersion(graphName, cur)
+                    conn.commit()
+                exportGraph("select * from %s" % (graphName), graphPath, conn, cur)
+                cur.execute("update my_matgraphs set fileStamp = '%s' where matgraphname = '%s';" % (mGP.getFileStamp(graphPath, version, viewToken), graphName))
+                conn.commit()
             
             #print "find the view"
             gQueryInfo.append(commandArray)
@@ -178,6 +179,19 @@ def getGQueryInfo(executeCommand, graphIndex, conn, cur):
             raise RuntimeError, "No such graph!!"
         
     return gQueryInfo
+
+#streams the edges of a graph query into the graph file with COPY, so that the rows are
+#never held in memory. COPY writes tab-separated lines and the executors only read the
+#first two columns of each line as the source and the target
+def exportGraph(selectCommand, graphPath, conn, cur):
+    startW_time = time.time()
+    graphFile = open(graphPath, 'w')
+    try:
+        cur.copy_expert("COPY (%s) TO STDOUT" % (selectCommand.strip().rstrip(';')), graphFile, COPY_BUFFER_SIZE)
+    finally:
+        graphFile.close()
+    conn.commit()
+    print "Graph writing time: ", time.time() - startW_time
         
     
 #Analyses the queries used to create graph on-the-fly or queries used to specify node condition        
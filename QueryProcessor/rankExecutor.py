@@ -9,46 +9,13 @@ import time
 import graph_tool.all as gt
 import numpy
 import os
+import resultWriter
+from graphCreator import graphCreator
+import graphCache
 
 matGraphDir = os.environ['HOME'] + "/RG_Mat_Graph/"
 tmpGraphDir = "/dev/shm/RG_Tmp_Graph/"
 
-#graphCreator for graph=tool
-class graphCreator():
-    def __init__(self, graphTxtName, isDirected):
-        f = open(graphTxtName)
-        self.idIndexDict = dict()
-        self.indexIdDict = dict()
-        self.g = gt.Graph(directed= isDirected)
-        index = 0
-        edge_list = []
-        for each in f:
-            if each.startswith("#"):
-                continue            
-            strPair = each.strip().split()
-            sourceId = int(strPair[0])
-            targetId = int(strPair[1])
-            if sourceId not in self.idIndexDict:   
-                self.g.add_vertex()
-                self.idIndexDict[sourceId] = index
-                self.indexIdDict[index] = sourceId
-                index += 1
-            if targetId not in self.idIndexDict:
-                self.g.add_vertex()
-                self.idIndexDict[targetId] =  index
-                self.indexIdDict[index] = targetId
-                index += 1
-                
-            if ((sourceId, targetId) not in edge_list):
-                if (isDirected == False):
-                    edge_list.append((sourceId, targetId))
-                    edge_list.append((targetId, sourceId))
-                    self.g.add_edge(self.g.vertex(self.idIndexDict[sourceId]), self.g.vertex(self.idIndexDict[targetId]))
-                else:
-                    edge_list.append((sourceId, targetId))
-                    self.g.add_edge(self.g.vertex(self.idIndexDict[sourceId]), self.g.vertex(self.idIndexDict[targetId]))
-                    
-
 #based on the measures, choose different methods to run the operations
 def processCommand(rankCommands, conn ,cur):
     
@@ -84,11 +51,11 @@ def snapCreateGraph(rankCommands):
     graphPath = getGraph(rankCommands[0])
     #rankCommands[0] is the graph name
     if "digraph" == rankCommands[2].lower().strip():
-        Graph = snap.LoadEdgeList(snap.PNGraph, graphPath, 0, 1)
+        Graph = graphCache.loadGraph(rankCommands[0], graphPath, "snap_digraph", lambda path: snap.LoadEdgeList(snap.PNGraph, path, 0, 1))
         return Graph
         
     elif "ungraph" == rankCommands[2].lower().strip():
-        Graph = snap.LoadEdgeList(snap.PUNGraph, graphPath, 0, 1)
+        Graph = graphCache.loadGraph(rankCommands[0], graphPath, "snap_ungraph", lambda path: snap.LoadEdgeList(snap.PUNGraph, path, 0, 1))
         return Graph
     
 #create a graph using graphTool   
@@ -96,11 +63,11 @@ def gtCreateGraph(rankCommands):
     graphPath = getGraph(rankCommands[0])
     #rankCommands[0] is the graph name
     if "digraph" in rankCommands[2].lower().strip():
-        Graph = graphCreator(graphPath, True)
+        Graph = graphCache.loadGraph(rankCommands[0], graphPath, "graphtool_digraph", lambda path: graphCreator(path, True))
         return Graph
         
     elif "ungraph" in rankCommands[2].lower().strip():
-        Graph = graphCreator(graphPath, False)
+        Graph = graphCache.loadGraph(rankCommands[0], graphPath, "graphtool_ungraph", lambda path: graphCreator(path, False))
         return Graph    
 
 #for indegree measure       
@@ -148,9 +115,7 @@ def betweenness(rankCommands, Graph, conn, cur):
     before_time = time.time()
     vp = gt.betweenness(Graph.g)[0] #betweenness returns two property map (vertex map and edge map) [0] means use vertex map
     values = vp.get_array()
-    idBt = dict()
-    for each in Graph.g.vertices():
-        idBt[Graph.indexIdDict[each]] = values[each]
+    idBt = dict(zip(Graph.indexId.tolist(), values.tolist()))
     print "Total handling time is: ", (time.time() - before_time)
     slist = sorted(idBt, key = lambda key: idBt[key], reverse = True)
     createTable(rankCommands, slist, idBt, conn, cur)
@@ -160,13 +125,9 @@ def closeness(rankCommands, Graph, conn, cur):
     gt.openmp_set_num_threads(4) #enable 4 threads for runing algorithm
     before_time = time.time()
     c = gt.closeness(Graph.g) 
-    values = c.get_array()
-    idCl = dict()
-    for each in Graph.g.vertices():
-        if numpy.isnan(values[each]):
-            idCl[Graph.indexIdDict[each]] = 0.0
-        else:   
-            idCl[Graph.indexIdDict[each]] = values[each]
+    values = numpy.array(c.get_array())
+    values[numpy.isnan(values)] = 0.0  #vertices that reach no other vertex get 0.0
+    idCl = dict(zip(Graph.indexId.tolist(), values.tolist()))
     print "Total handling time is: ", (time.time() - before_time)
     slist = sorted(idCl, key = lambda key: idCl[key], reverse = True)
     createTable(rankCommands, slist, idCl, conn, cur)
@@ -197,8 +158,7 @@ def createTable(rankCommands, slist, DegH, conn, cur):
     tableName = rankCommands[-1]
     #print "create temp table " + graphCommand[3] + " (" + graphCommand[1] + " int not null primary key, " + graphCommand[2] + " int);"
     #print "create temp table " + tableName + " (" + Col1 + " int not null primary key, " + Col2 + " real);"
-    cur.execute("create temp table " + tableName + " ( VertexID int not null primary key,  Value real);")
-    conn.commit()
+    writer = resultWriter.tableWriter(tableName, [("VertexID", "int not null"), ("Value", "real")], "VertexID", conn, cur)
     for item in slist:
-        cur.execute("INSERT INTO " + tableName + " VALUES(%s, %s)" % (item, DegH[item]))
-        conn.commit()
\ No newline at end of file
+        writer.writeRow((item, DegH[item]))
+    writer.close()
\ No newline at end of file
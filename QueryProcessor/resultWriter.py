@@ -0,0 +1,54 @@
+'''
+The resultWriter is to load the results of rank, cluster and path operations into temp tables in PostgreSQL.
+Rows are buffered in the text format of COPY and streamed with COPY FROM STDIN, all in one transaction,
+and the primary key is only added after all the rows are loaded, so that its index is built once.
+
+@author: minjian
+'''
+import cStringIO
+
+#number of buffered bytes sent to PostgreSQL in one COPY
+COPY_BUFFER_SIZE = 1 << 22
+
+#writes the rows of a result into a new temp table
+class tableWriter():
+    #columns is a list of (name, type) pairs, and primaryKey the name of the key column
+    def __init__(self, tableName, columns, primaryKey, conn, cur):
+        self.tableName = tableName
+        self.primaryKey = primaryKey
+        self.conn = conn
+        self.cur = cur
+        self.buffer = cStringIO.StringIO()
+        self.rowNum = 0
+        cur.execute("create temp table " + tableName + " (" + ", ".join([name + " " + colType for name, colType in columns]) + ");")
+
+    #adds a row; lists are written as arrays
+    def writeRow(self, row):
+        self.buffer.write("\t".join([formatValue(each) for each in row]))
+        self.buffer.write("\n")
+        self.rowNum += 1
+        if self.buffer.tell() >= COPY_BUFFER_SIZE:
+            self.flush()
+
+    #sends the buffered rows to PostgreSQL
+    def flush(self):
+        if self.buffer.tell() > 0:
+            self.buffer.seek(0)
+            self.cur.copy_expert("COPY " + self.tableName + " FROM STDIN", self.buffer)
+            self.buffer = cStringIO.StringIO()
+
+    #sends the rest of the rows, adds the primary key and commits the whole table
+    def close(self):
+        self.flush()
+        if self.primaryKey is not None:
+            self.cur.execute("alter table " + self.tableName + " add primary key (" + self.primaryKey + ");")
+        self.conn.commit()
+        return self.rowNum
+
+#formats a value in the text format of COPY
+def formatValue(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, (list, tuple)):
+        return "{" + ",".join([str(each) for each in value]) + "}"
+    return str(value)
@@ -0,0 +1,497 @@
+#!/usr/bin/env python
+
+#########################################################################
+#   This code stores a graph in compressed sparse row (CSR) form. The   #
+#   neighbours of all vertices are kept in one contiguous array, and    #
+#   an array of offsets points to the first neighbour of each vertex.   #
+#   Vertices are renamed to dense ids 0..n-1 and the original ids are   #
+#   kept to map the results back. kcore, ktruss, kecc and ocs load      #
+#   their graphs through this class. Only kcore works on the CSR arrays #
+#   themselves (see NeighborLists); ktruss, kecc and ocs copy them into #
+#   their dictionaries of vertices with fill_graph, and ktruss takes a  #
+#   CSR snapshot of its dictionary again for truss decomposition and    #
+#   its TCP index. With NumPy, edge lists are parsed in large chunks,   #
+#   and the CSR arrays of a graph file are saved next to it, to be      #
+#   loaded instead of parsed while the file is unchanged.               #
+#   Author: Mojtaba (Omid) Rezvani                                      #
+#########################################################################
+
+import os
+import sys
+from array import array
+
+# NumPy is only needed for the bulk loader and its cache
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Bytes of the edge list parsed at a time by the bulk loader
+CHUNK_BYTES = 1 << 26
+
+# Layout of the cache files; caches of another version are rebuilt
+CACHE_VERSION = 1
+
+# Graph files under these directories are temporary and never cached
+TEMP_GRAPH_DIRS = ('/dev/shm/',)
+
+
+
+
+#########################################################################
+#   CSR graph; neighbours of vertex v are adj[offsets[v]:offsets[v+1]]  #
+#   and they are sorted in increasing order of their dense ids          #
+#########################################################################
+class CSRGraph:
+
+    #########################################################################
+    #   Initialize an empty graph                                           #
+    #########################################################################
+    def __init__(self):
+        # Contiguous buffers of offsets and neighbours
+        self.offsets = array('l', [0])
+        self.adj = array('i')
+        # The original id of every dense vertex and its inverse, which is
+        # built on demand by vertex_numbers for graphs loaded with NumPy
+        self.ids = []
+        self.vert_num = {}
+        self.num_vertices = 0
+        self.num_edges = 0
+        # Undirected edge ids, built on demand by build_edge_ids
+        self.edge_ids = None
+        self.edge_src = None
+        self.edge_dst = None
+
+
+    #########################################################################
+    #   Read the list of edges of a graph from a file. With NumPy and with  #
+    #   cache set, the CSR arrays are loaded from the cache of the file if  #
+    #   it is up to date, or else built in bulk and saved to the cache. By  #
+    #   default, files kept on disk across queries, such as materialised    #
+    #   graphs, are cached, and temporary graphs are parsed every time.     #
+    #########################################################################
+    def read_graph(self, graph_file, cache=None):
+        if numpy is None:
+            self.read_graph_text(graph_file)
+            return
+        if cache is None:
+            cache = not is_temporary(graph_file)
+        if cache and self.load_cache(graph_file):
+            return
+        src, dst = read_edge_arrays(graph_file)
+        self.build_arrays(src, dst)
+        if cache:
+            try:
+                self.save_cache(graph_file)
+            except (IOError, OSError):
+                # The graph is still loaded; it is parsed again next time
+                pass
+
+
+    #########################################################################
+    #   Read the list of edges of a graph from a file, line by line         #
+    #########################################################################
+    def read_graph_text(self, graph_file):
+        src = array('l')
+        dst = array('l')
+        with open(graph_file) as gf:
+            for line in gf:
+                e = line.split()
+                if len(e) < 2 or e[0].startswith('#'):
+                    continue
+                src.append(int(e[0]))
+                dst.append(int(e[1]))
+        gf.close()
+        self.build(src, dst)
+
+
+    #########################################################################
+    #   Build the CSR arrays from two parallel sequences of endpoints.      #
+    #   Self loops and parallel edges are dropped. Vertices get dense ids   #
+    #   in increasing order of original ids, unless the list of original    #
+    #   ids is given in the order of their dense ids.                       #
+    #########################################################################
+    def build(self, src, dst, ids=None):
+        # Rename vertices to dense ids
+        if ids is None:
+            self.ids = sorted(set(src).union(dst))
+        else:
+            self.ids = list(ids)
+        self.vert_num = dict((node, i) for i, node in enumerate(self.ids))
+        n = len(self.ids)
+        vert_num = self.vert_num
+        u_of = array('i', (vert_num[node] for node in src))
+        v_of = array('i', (vert_num[node] for node in dst))
+
+        # Count the degrees; every edge is stored in both directions
+        offsets = array('l', [0]) * (n + 1)
+        for i in xrange(len(u_of)):
+            if u_of[i] != v_of[i]:
+                offsets[u_of[i] + 1] += 1
+                offsets[v_of[i] + 1] += 1
+        for v in xrange(n):
+            offsets[v + 1] += offsets[v]
+
+        # Scatter the neighbours into their slots
+        adj = array('i', [0]) * offsets[n]
+        fill = offsets[:n]
+        for i in xrange(len(u_of)):
+            u = u_of[i]
+            v = v_of[i]
+            if u != v:
+                adj[fill[u]] = v
+                fill[u] += 1
+                adj[fill[v]] = u
+                fill[v] += 1
+
+        # Sort the neighbours and squeeze out parallel edges in place
+        pos = 0
+        start = 0
+        for v in xrange(n):
+            end = offsets[v + 1]
+            neighbours = sorted(set(adj[start:end]))
+            offsets[v] = pos
+            adj[pos:pos + len(neighbours)] = array('i', neighbours)
+            pos += len(neighbours)
+            start = end
+        offsets[n] = pos
+        del adj[pos:]
+
+        self.offsets = offsets
+        self.adj = adj
+        self.num_vertices = n
+        self.num_edges = pos // 2
+        self.edge_ids = None
+        self.edge_src = None
+        self.edge_dst = None
+
+
+    #########################################################################
+    #   Same as build, on NumPy arrays of endpoints. Ids are renamed by     #
+    #   sorting them, and both copies of every edge are encoded as keys     #
+    #   u * n + v, so that sorting the unique keys drops parallel edges and #
+    #   leaves the neighbours of every vertex sorted in place.              #
+    #########################################################################
+    def build_arrays(self, src, dst):
+        ids, dense = numpy.unique(numpy.concatenate((src, dst)), return_inverse=True)
+        n = len(ids)
+        u = dense[:len(src)].astype(numpy.int64)
+        v = dense[len(src):].astype(numpy.int64)
+        loops = u == v
+        if loops.any():
+            u = u[~loops]
+            v = v[~loops]
+        keys = numpy.unique(numpy.concatenate((u * n + v, v * n + u)))
+        offsets = numpy.zeros(n + 1, dtype=numpy.dtype('l'))
+        if n > 0:
+            offsets[1:] = numpy.cumsum(numpy.bincount(keys // n, minlength=n))
+            keys %= n
+        self.set_arrays(offsets, keys.astype(numpy.dtype('i')), ids)
+
+
+    #########################################################################
+    #   Take the CSR arrays from NumPy arrays (or memory maps of them).     #
+    #   The offsets and neighbours are copied in one block each into the    #
+    #   arrays the algorithms index, which Python reads several times       #
+    #   faster than NumPy arrays. The ids stay as they are; they are        #
+    #   sorted, so vert_num is only built if vertex_numbers is called.      #
+    #########################################################################
+    def set_arrays(self, offsets, adj, ids):
+        self.offsets = to_array(offsets, 'l')
+        self.adj = to_array(adj, 'i')
+        self.ids = ids
+        self.vert_num = None
+        self.num_vertices = len(ids)
+        self.num_edges = len(self.adj) // 2
+        self.edge_ids = None
+        self.edge_src = None
+        self.edge_dst = None
+
+
+    #########################################################################
+    #   Save the CSR arrays to the cache of a graph file. The stamp of the  #
+    #   file is written last, so a cache left half written is not used.     #
+    #########################################################################
+    def save_cache(self, graph_file):
+        directory = cache_dir(graph_file)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        stamp_file = os.path.join(directory, 'stamp.npy')
+        if os.path.exists(stamp_file):
+            os.remove(stamp_file)
+        numpy.save(os.path.join(directory, 'offsets.npy'), numpy.frombuffer(self.offsets, dtype=numpy.dtype('l')))
+        numpy.save(os.path.join(directory, 'adj.npy'), numpy.frombuffer(self.adj, dtype=numpy.dtype('i')))
+        numpy.save(os.path.join(directory, 'ids.npy'), self.ids)
+        numpy.save(stamp_file, source_stamp(graph_file))
+
+
+    #########################################################################
+    #   Load the CSR arrays from the cache of a graph file, which is        #
+    #   memory-mapped instead of parsed. It returns False if there is no    #
+    #   cache or if the file has changed since it was written.              #
+    #########################################################################
+    def load_cache(self, graph_file):
+        directory = cache_dir(graph_file)
+        try:
+            stamp = numpy.load(os.path.join(directory, 'stamp.npy'))
+            if not numpy.array_equal(stamp, source_stamp(graph_file)):
+                return False
+            offsets = numpy.load(os.path.join(directory, 'offsets.npy'), mmap_mode='r')
+            adj = numpy.load(os.path.join(directory, 'adj.npy'), mmap_mode='r')
+            ids = numpy.load(os.path.join(directory, 'ids.npy'), mmap_mode='r')
+        except (IOError, OSError, ValueError):
+            return False
+        self.set_arrays(offsets, adj, ids)
+        return True
+
+
+    #########################################################################
+    #   Get the sorted neighbours of a dense vertex                         #
+    #########################################################################
+    def neighbors(self, v):
+        return self.adj[self.offsets[v]:self.offsets[v + 1]]
+
+
+    #########################################################################
+    #   Get the dense id of a vertex given its original id, or -1. Sorted   #
+    #   NumPy ids are binary searched instead of building vert_num.         #
+    #########################################################################
+    def get_index(self, node):
+        if self.vert_num is None:
+            i = int(numpy.searchsorted(self.ids, node))
+            if i < self.num_vertices and self.ids[i] == node:
+                return i
+            return -1
+        return self.vert_num.get(node, -1)
+
+
+    #########################################################################
+    #   Get the original id of a dense vertex                               #
+    #########################################################################
+    def get_id(self, v):
+        if isinstance(self.ids, list):
+            return self.ids[v]
+        return self.ids[v].item()
+
+
+    #########################################################################
+    #   Get the original ids of all dense vertices as a list                #
+    #########################################################################
+    def id_list(self):
+        if isinstance(self.ids, list):
+            return list(self.ids)
+        return self.ids.tolist()
+
+
+    #########################################################################
+    #   Get the map from original ids to dense ids, building it if needed   #
+    #########################################################################
+    def vertex_numbers(self):
+        if self.vert_num is None:
+            self.vert_num = dict((node, i) for i, node in enumerate(self.id_list()))
+        return self.vert_num
+
+
+    #########################################################################
+    #   Number the undirected edges (u, v) with u < v 0..m-1 in increasing  #
+    #   order. The array edge_ids is parallel to adj, so both copies of an  #
+    #   edge share the same id; edge_src and edge_dst give the endpoints of #
+    #   each id.                                                            #
+    #########################################################################
+    def build_edge_ids(self):
+        if self.edge_ids is not None:
+            return self.edge_ids
+        offsets = self.offsets
+        adj = self.adj
+        edge_ids = array('l', [0]) * len(adj)
+        edge_src = array('i', [0]) * self.num_edges
+        edge_dst = array('i', [0]) * self.num_edges
+        # The copy (v, u) of an edge with u < v comes before the copy (u, v)
+        # when v is scanned, so the position of the next lower neighbour of
+        # each vertex is kept in fill
+        fill = offsets[:self.num_vertices]
+        e = 0
+        for u in xrange(self.num_vertices):
+            for i in xrange(offsets[u], offsets[u + 1]):
+                v = adj[i]
+                if v > u:
+                    edge_ids[i] = e
+                    edge_ids[fill[v]] = e
+                    fill[v] += 1
+                    edge_src[e] = u
+                    edge_dst[e] = v
+                    e += 1
+        self.edge_ids = edge_ids
+        self.edge_src = edge_src
+        self.edge_dst = edge_dst
+        return edge_ids
+
+
+    #########################################################################
+    #   Add the vertices and edges to a graph made of Vertex objects, such  #
+    #   as those of ktruss, kecc and ocs, through its add_vertex and the    #
+    #   add_neighbor of its vertices. Vertices are added in dense order, so #
+    #   the vert_num of the graph agrees with the dense ids.                #
+    #########################################################################
+    def fill_graph(self, graph, weight):
+        vertices = [graph.add_vertex(node) for node in self.id_list()]
+        offsets = self.offsets
+        adj = self.adj
+        for v in xrange(self.num_vertices):
+            vertex = vertices[v]
+            for i in xrange(offsets[v], offsets[v + 1]):
+                vertex.add_neighbor(vertices[adj[i]], weight)
+
+
+
+
+
+#########################################################################
+#   Lists of neighbours over the CSR arrays of a graph, for algorithms  #
+#   that index and change them as a list of arrays. A list is read from #
+#   the shared arrays until it is changed; only then it is copied into  #
+#   an array of its own (see mutable), and so are the lists of vertices #
+#   added later.                                                        #
+#########################################################################
+class NeighborLists:
+
+    #########################################################################
+    #   Initialize the lists of a CSR graph, or empty lists                 #
+    #########################################################################
+    def __init__(self, csr=None):
+        if csr is None:
+            csr = CSRGraph()
+        self.offsets = csr.offsets
+        self.adj = csr.adj
+        self.n = csr.num_vertices
+        # Lists changed since they were read from the CSR arrays
+        self.changed = {}
+
+
+    #########################################################################
+    #   Get the number of vertices                                          #
+    #########################################################################
+    def __len__(self):
+        return self.n
+
+
+    #########################################################################
+    #   Get the sorted neighbours of a dense vertex; a list that was not    #
+    #   changed is returned as a new array, so it must not be changed       #
+    #########################################################################
+    def __getitem__(self, v):
+        neighbours = self.changed.get(v)
+        if neighbours is None:
+            return self.adj[self.offsets[v]:self.offsets[v + 1]]
+        return neighbours
+
+
+    #########################################################################
+    #   Replace the neighbours of a dense vertex                            #
+    #########################################################################
+    def __setitem__(self, v, neighbours):
+        self.changed[v] = neighbours
+
+
+    #########################################################################
+    #   Add a vertex with a list of neighbours                              #
+    #########################################################################
+    def append(self, neighbours):
+        self.changed[self.n] = neighbours
+        self.n += 1
+
+
+    #########################################################################
+    #   Get the neighbours of a dense vertex in an array that can be        #
+    #   changed in place                                                    #
+    #########################################################################
+    def mutable(self, v):
+        neighbours = self.changed.get(v)
+        if neighbours is None:
+            neighbours = self.changed[v] = self.adj[self.offsets[v]:self.offsets[v + 1]]
+        return neighbours
+
+
+
+
+#########################################################################
+#   Copy a NumPy array (or a memory map of one) into an array of the    #
+#   given type code; arrays of that type are returned as they are       #
+#########################################################################
+def to_array(values, typecode):
+    if isinstance(values, array) and values.typecode == typecode:
+        return values
+    return array(typecode, numpy.ascontiguousarray(values, dtype=numpy.dtype(typecode)).tostring())
+
+
+#########################################################################
+#   Tell whether a graph file is under one of the temporary directories #
+#########################################################################
+def is_temporary(graph_file):
+    path = os.path.realpath(graph_file)
+    return any(path.startswith(directory) for directory in TEMP_GRAPH_DIRS)
+
+
+#########################################################################
+#   Get the directory that holds the cache of a graph file              #
+#########################################################################
+def cache_dir(graph_file):
+    return graph_file + '.csr'
+
+
+#########################################################################
+#   Get the version of the cache layout with the size and modification  #
+#   time of a graph file, which tell whether a cache is up to date      #
+#########################################################################
+def source_stamp(graph_file):
+    info = os.stat(graph_file)
+    return numpy.array([CACHE_VERSION, info.st_size, int(info.st_mtime * 1000000)], dtype=numpy.int64)
+
+
+#########################################################################
+#   Parses a chunk of whole lines of an edge list into an array of      #
+#   (source, destination) rows. A chunk with no comments and the same   #
+#   number of columns on every line is parsed by NumPy in one call;     #
+#   any other chunk is parsed line by line, as read_graph_text does.    #
+#########################################################################
+def parse_chunk(text):
+    lines = text.count('\n') + (not text.endswith('\n'))
+    columns = len(text[:text.find('\n')].split())
+    if '#' not in text and columns >= 2:
+        values = numpy.fromstring(text, dtype=numpy.int64, sep=' ')
+        if len(values) == lines * columns:
+            return values.reshape(lines, columns)[:, :2]
+    rows = []
+    for line in text.splitlines():
+        e = line.split()
+        if len(e) < 2 or e[0].startswith('#'):
+            continue
+        rows.append((int(e[0]), int(e[1])))
+    return numpy.array(rows, dtype=numpy.int64).reshape(len(rows), 2)
+
+
+#########################################################################
+#   Read the edge list of a file into NumPy arrays of endpoints, in     #
+#   chunks of about CHUNK_BYTES cut at line ends                        #
+#########################################################################
+def read_edge_arrays(graph_file):
+    chunks = []
+    rest = ''
+    with open(graph_file, 'rb') as gf:
+        while True:
+            block = gf.read(CHUNK_BYTES)
+            if not block:
+                break
+            block = rest + block
+            end = block.rfind('\n') + 1
+            rest = block[end:]
+            if end > 0:
+                chunks.append(parse_chunk(block[:end]))
+    if rest.strip():
+        chunks.append(parse_chunk(rest))
+    if len(chunks) == 0:
+        edges = numpy.zeros((0, 2), dtype=numpy.int64)
+    else:
+        edges = numpy.concatenate(chunks)
+    return edges[:, 0].copy(), edges[:, 1].copy()
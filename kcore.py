@@ -8,6 +8,178 @@
 
 import sys
 from os.path import isfile, join
+from array import array
+import heapq
+import bisect
+import csrgraph
+
+
+#########################################################################
+#   Computes the core numbers of a graph given as a list of lists of    #
+#   neighbours, in O(m) time. Vertices are put into bins by degree and  #
+#   processed in increasing order; when a vertex is removed, each of    #
+#   its neighbours with a larger degree is moved one bin down.          #
+#########################################################################
+def bin_sort_cores(edges):
+    n = len(edges)
+    degrees = array('i', [len(edges[v]) for v in xrange(n)])
+    max_degree = max(degrees) if n > 0 else 0
+
+    # bins[d] is the position of the first vertex of degree d in vert
+    bins = array('l', [0]) * (max_degree + 1)
+    for v in xrange(n):
+        bins[degrees[v]] += 1
+    start = 0
+    for d in xrange(max_degree + 1):
+        num = bins[d]
+        bins[d] = start
+        start += num
+
+    # Sort the vertices by degree; pos[v] is the position of v in vert
+    pos = array('l', [0]) * n
+    vert = array('i', [0]) * n
+    for v in xrange(n):
+        pos[v] = bins[degrees[v]]
+        vert[pos[v]] = v
+        bins[degrees[v]] += 1
+    for d in xrange(max_degree, 0, -1):
+        bins[d] = bins[d - 1]
+    bins[0] = 0
+
+    # Peel the vertices; the degree of a vertex when it is reached is its core number
+    for i in xrange(n):
+        v = vert[i]
+        for u in edges[v]:
+            if degrees[u] > degrees[v]:
+                du = degrees[u]
+                pu = pos[u]
+                pw = bins[du]
+                w = vert[pw]
+                if u != w:
+                    pos[u] = pw
+                    vert[pu] = w
+                    pos[w] = pu
+                    vert[pw] = u
+                bins[du] += 1
+                degrees[u] -= 1
+    return degrees
+
+
+
+
+#########################################################################
+#   Core-component forest. A node is a connected component of a k-core  #
+#   that is not a component of the (k+1)-core; its parent is the        #
+#   component of a smaller core that contains it. Each vertex is kept   #
+#   in the node of its own core number, so the members of a component   #
+#   are the vertices in the subtree of its node.                        #
+#########################################################################
+class CoreIndex:
+
+    #########################################################################
+    #   Builds the forest by adding vertices in decreasing order of core    #
+    #   number and merging the components they touch with a union-find      #
+    #########################################################################
+    def __init__(self, edges, cores):
+        n = len(edges)
+        self.node_k = array('i')
+        self.node_parent = array('l')
+        self.node_vertices = []
+        self.node_children = []
+        self.vertex_node = array('l', [-1]) * n
+
+        # Vertices grouped by their core number; vertices of core 0 are left out
+        max_core = max(cores) if n > 0 else 0
+        levels = [[] for k in xrange(max_core + 1)]
+        for v in xrange(n):
+            if cores[v] > 0:
+                levels[cores[v]].append(v)
+
+        # Union-find over vertices, and the tree node of the component of each root
+        parent = array('l', xrange(n))
+        size = array('l', [1]) * n
+        comp_node = array('l', [-1]) * n
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for k in xrange(max_core, 0, -1):
+            if len(levels[k]) == 0:
+                continue
+            # Components of the (k+1)-core touched by the new vertices
+            touched = set()
+            for v in levels[k]:
+                for u in edges[v]:
+                    if cores[u] > k:
+                        touched.add(find(u))
+            # Merge the new vertices with their neighbours in the k-core
+            for v in levels[k]:
+                for u in edges[v]:
+                    if cores[u] >= k:
+                        ru = find(u)
+                        rv = find(v)
+                        if ru != rv:
+                            if size[ru] < size[rv]:
+                                ru, rv = rv, ru
+                            parent[rv] = ru
+                            size[ru] += size[rv]
+            # One new node for every component that contains new vertices
+            new_node = {}
+            for v in levels[k]:
+                r = find(v)
+                if r not in new_node:
+                    new_node[r] = len(self.node_k)
+                    self.node_k.append(k)
+                    self.node_parent.append(-1)
+                    self.node_vertices.append([])
+                    self.node_children.append([])
+                node = new_node[r]
+                self.node_vertices[node].append(v)
+                self.vertex_node[v] = node
+            for r in touched:
+                child = comp_node[r]
+                node = new_node[find(r)]
+                self.node_parent[child] = node
+                self.node_children[node].append(child)
+            for r in new_node:
+                comp_node[r] = new_node[r]
+
+
+    #########################################################################
+    #   Finds the lowest common ancestor of the nodes of given vertices.    #
+    #   It returns -1 if some vertex is in no k-core for k >= 1, or if the  #
+    #   vertices are in different trees.                                    #
+    #########################################################################
+    def lowest_common_ancestor(self, vertices):
+        nodes = set(self.vertex_node[v] for v in vertices)
+        if -1 in nodes:
+            return -1
+        # A parent always has a smaller k, so we lift the node with the largest k
+        while len(nodes) > 1:
+            node = max(nodes, key=lambda x: self.node_k[x])
+            nodes.remove(node)
+            if self.node_parent[node] == -1:
+                return -1
+            nodes.add(self.node_parent[node])
+        return nodes.pop()
+
+
+    #########################################################################
+    #   Returns the vertices in the subtree of a node                       #
+    #########################################################################
+    def subtree_vertices(self, node):
+        vertices = []
+        stack = [node]
+        while len(stack) > 0:
+            x = stack.pop()
+            vertices += self.node_vertices[x]
+            stack += self.node_children[x]
+        return vertices
+
+
 
 
 #########################################################################
@@ -20,79 +192,216 @@ class Graph:
     #########################################################################
     def __init__(self):
         # The graph is a simple data structure: a list of lists, adjacency list
-        self.edges = []
+        # Vertices are dense ids; the lists of neighbours are read from the
+        # CSR arrays, and only copied into arrays of their own when changed
+        self.edges = csrgraph.NeighborLists()
+        # The original id of every vertex and its inverse
+        self.vert_id = []
+        self.vert_num = {}
+        # Core numbers of vertices, computed on demand by core_numbers
+        self.cores = None
+        # Core-component forest, built on demand by build_core_index
+        self.core_index = None
 
 
     #########################################################################
     #   Reads the edge list of the graph into an adjacency matrix           #
     #########################################################################
-    def read_graph(self, graph_file):
-        with open(graph_file) as gf:
-            for line in gf:
-                e = [int(v) for v in line.split()]
-                if len(self.edges) < max(e[0], e[1]) + 1:
-                    for i in range(0, max(e[0], e[1]) + 1):
-                        self.edges.append([])
-                self.edges[e[0]].append(e[1])
-                self.edges[e[1]].append(e[0])
-        gf.close()
+    def read_graph(self, graph_file, cache=None):
+        csr = csrgraph.CSRGraph()
+        csr.read_graph(graph_file, cache)
+        self.read_csr(csr)
 
 
     #########################################################################
-    #   Removes all edges that are not in the kcore of the graph            #
+    #   Takes the adjacency lists from a graph loaded in CSR form           #
     #########################################################################
-    def make_kcore(self, k):
-        ## kcore detection begins here
-        # Let's store the degrees of vertices
-        degrees = [None]*len(self.edges)
-        for i in range(0, len(self.edges)):
-            degrees[i] = len(self.edges[i])
+    def read_csr(self, csr):
+        self.edges = csrgraph.NeighborLists(csr)
+        self.vert_id = csr.id_list()
+        self.vert_num = dict(csr.vertex_numbers())
+        self.cores = None
+        self.core_index = None
 
-        # Initial set of vertices with degree less than k
-        q = [i for i in range(0, len(degrees)) if degrees[i] < k]
-        map(degrees.__setitem__, q, [-1]*len(q))
 
-        # Iterate over vertices and remove the ones with degree less than k
-        while len(q) > 0:
-            # We pop the last item of the list, as it is done in O(1)
-            v = q.pop(len(q) - 1)
-            for u in self.edges[v]:
-                degrees[u] -= 1
-                if degrees[u] < k and degrees[u] != -1:
-                    q.append(u)
-                    degrees[u] = -1
-            del self.edges[v][:]
+    #########################################################################
+    #   Get the dense id of a vertex given its original id                  #
+    #########################################################################
+    def get_index(self, node):
+        return self.vert_num[node]
 
 
-    ######################################################################################################
-    # Detects the kcore of the graph and returns a bunch of kcore components (including single vertices) #
-    # This needs to be changed to only detecting kcore, not removing edges                               #
-    ######################################################################################################
-    def detect_kcore(self, k):
-        ## kcore detection begins here
-        # Let's store the degrees of vertices
-        degrees = [None]*len(self.edges)
-        for i in range(0, len(self.edges)):
-            degrees[i] = len(self.edges[i])
+    #########################################################################
+    #   Get the original id of a dense vertex                               #
+    #########################################################################
+    def get_id(self, v):
+        return self.vert_id[v]
 
-        # Initial set of vertices with degree less than k
-        q = [i for i in range(0, len(degrees)) if degrees[i] < k]
-        map(degrees.__setitem__, q, [-1]*len(q))
 
-        # Iterate over vertices and remove the ones with degree less than k
-        while len(q) > 0:
-            # We pop the last item of the list, as it is done in O(1)
-            v = q.pop(len(q) - 1)
-            for u in self.edges[v]:
-                degrees[u] -= 1
-                if degrees[u] < k and degrees[u] != -1:
-                    q.append(u)
-                    degrees[u] = -1
-            del self.edges[v][:]
+    #########################################################################
+    #   Computes the core number of every vertex in one pass, using the     #
+    #   bin sort of Batagelj and Zaversnik. The result is cached, so that   #
+    #   the k-core for any k is a filter over this array.                   #
+    #########################################################################
+    def core_numbers(self):
+        if self.cores is None:
+            self.cores = bin_sort_cores(self.edges)
+        return self.cores
 
-        # Find the connected components
-        components = self.detect_connected_components();
-        return components
+
+    #########################################################################
+    #   Adds a vertex with no edges and returns its dense id                #
+    #########################################################################
+    def add_vertex(self, node):
+        self.vert_num[node] = len(self.edges)
+        self.vert_id.append(node)
+        self.edges.append(array('i'))
+        if self.cores is not None:
+            self.cores.append(0)
+        self.core_index = None
+        return len(self.edges) - 1
+
+
+    #########################################################################
+    #   Finds the vertices of core number K reachable from the roots        #
+    #   through vertices of core number K; the only ones whose core number  #
+    #   can change when an edge between the roots is added or removed       #
+    #########################################################################
+    def subcore(self, roots, K):
+        cores = self.cores
+        subcore = set(roots)
+        stack = list(roots)
+        while len(stack) > 0:
+            x = stack.pop()
+            for y in self.edges[x]:
+                if cores[y] == K and y not in subcore:
+                    subcore.add(y)
+                    stack.append(y)
+        return subcore
+
+
+    #########################################################################
+    #   Inserts an edge and updates the stored core numbers. Only the       #
+    #   subcore of the endpoint with the smaller core number is visited;    #
+    #   its vertices that keep more than K neighbours of core >= K after    #
+    #   peeling move up to core K+1.                                        #
+    #########################################################################
+    def insert_edge(self, frm, to):
+        if frm not in self.vert_num:
+            self.add_vertex(frm)
+        if to not in self.vert_num:
+            self.add_vertex(to)
+        u = self.vert_num[frm]
+        v = self.vert_num[to]
+        if u == v:
+            return
+        neighbours = self.edges.mutable(u)
+        i = bisect.bisect_left(neighbours, v)
+        if i < len(neighbours) and neighbours[i] == v:
+            return
+        neighbours.insert(i, v)
+        bisect.insort(self.edges.mutable(v), u)
+        self.core_index = None
+        if self.cores is None:
+            return
+
+        cores = self.cores
+        K = min(cores[u], cores[v])
+        subcore = self.subcore([x for x in (u, v) if cores[x] == K], K)
+        # Number of neighbours that can support a core number above K
+        cd = {}
+        for x in subcore:
+            cd[x] = sum(1 for y in self.edges[x] if cores[y] >= K)
+        # Peel the vertices that cannot have more than K such neighbours
+        removed = set()
+        stack = [x for x in subcore if cd[x] <= K]
+        while len(stack) > 0:
+            x = stack.pop()
+            if x in removed:
+                continue
+            removed.add(x)
+            for y in self.edges[x]:
+                if y in subcore and y not in removed:
+                    cd[y] -= 1
+                    if cd[y] <= K:
+                        stack.append(y)
+        for x in subcore:
+            if x not in removed:
+                cores[x] = K + 1
+
+
+    #########################################################################
+    #   Deletes an edge and updates the stored core numbers. Vertices of    #
+    #   the subcore left with fewer than K neighbours of core >= K drop to  #
+    #   core K-1, and this is propagated through the subcore only.          #
+    #########################################################################
+    def delete_edge(self, frm, to):
+        if frm not in self.vert_num or to not in self.vert_num:
+            return
+        u = self.vert_num[frm]
+        v = self.vert_num[to]
+        neighbours = self.edges.mutable(u)
+        i = bisect.bisect_left(neighbours, v)
+        if i == len(neighbours) or neighbours[i] != v:
+            return
+        del neighbours[i]
+        neighbours = self.edges.mutable(v)
+        del neighbours[bisect.bisect_left(neighbours, u)]
+        self.core_index = None
+        if self.cores is None:
+            return
+
+        cores = self.cores
+        K = min(cores[u], cores[v])
+        if K == 0:
+            return
+        subcore = self.subcore([x for x in (u, v) if cores[x] == K], K)
+        cd = {}
+        for x in subcore:
+            cd[x] = sum(1 for y in self.edges[x] if cores[y] >= K)
+        stack = [x for x in subcore if cd[x] < K]
+        while len(stack) > 0:
+            x = stack.pop()
+            if cores[x] != K:
+                continue
+            cores[x] = K - 1
+            for y in self.edges[x]:
+                if y in subcore and cores[y] == K:
+                    cd[y] -= 1
+                    if cd[y] < K:
+                        stack.append(y)
+
+
+    #########################################################################
+    #   Removes all edges that are not in the kcore of the graph            #
+    #########################################################################
+    def make_kcore(self, k):
+        cores = self.core_numbers()
+        # Vertices out of the kcore lose all their edges, and the remaining
+        # ones only keep their neighbours inside the kcore
+        for v in xrange(len(self.edges)):
+            if cores[v] < k:
+                self.edges[v] = array('i')
+            else:
+                self.edges[v] = array('i', [u for u in self.edges[v] if cores[u] >= k])
+        # Removing vertices out of the kcore does not change the core number of others
+        for v in xrange(len(self.edges)):
+            if cores[v] < k:
+                cores[v] = 0
+        self.core_index = None
+
+
+    #########################################################################
+    #   Detects the kcore of the graph and returns its connected components #
+    #   in terms of original ids. The graph is not modified.                #
+    #########################################################################
+    def detect_kcore(self, k):
+        map_component = self.detect_connected_components_inversely(k)
+        components = {}
+        for v in xrange(len(self.edges)):
+            if map_component[v] != -1:
+                components.setdefault(map_component[v], []).append(self.vert_id[v])
+        return [components[c] for c in sorted(components)]
 
 
     ###############################################################################################
@@ -121,14 +430,17 @@ class Graph:
 
     ############################################################################################################
     # Finds connected components of the graph and returns the list of ID of connected component of each vertex #
+    # If k is given, only the kcore is considered and vertices out of it get -1                                #
     ############################################################################################################
-    def detect_connected_components_inversely(self):
+    def detect_connected_components_inversely(self, k=0):
         # Find the connected components of the resulting graph
+        if k > 0:
+            cores = self.core_numbers()
         inList = [0]*len(self.edges)
         connected_component_of_v = [-1]*len(self.edges)
         c = -1
         for i in range(0, len(self.edges)):
-            if inList[i]:
+            if inList[i] or (k > 0 and cores[i] < k):
                 continue
             c += 1
             connected_component_of_v[i] = c;
@@ -138,7 +450,7 @@ class Graph:
             while qq < len(component):
                 v = component[qq]
                 for u in self.edges[v]:
-                    if inList[u] == 0:
+                    if inList[u] == 0 and (k == 0 or cores[u] >= k):
                         connected_component_of_v[u] = c;
                         component.append(u)
                         inList[u] = 1
@@ -146,31 +458,109 @@ class Graph:
         return connected_component_of_v
                 
 
+    #########################################################################
+    #   Builds the core-component forest of the graph; it is kept until     #
+    #   the graph is changed                                                #
+    #########################################################################
+    def build_core_index(self):
+        if self.core_index is None:
+            self.core_index = CoreIndex(self.edges, self.core_numbers())
+        return self.core_index
+
+
     #######################################################################################################################
     # Queries a set of vertices among kcores and finds the largest k for which a kcore includes all vertices in the query #
+    # This is the lowest common ancestor of the query vertices in the core-component forest                               #
     #######################################################################################################################
-    def query_kcores(query_vertices):
-        k = 0
-        # This is a flag, determining whether we can still increase the k in kcore or we should stop and output the kcore
-        must_decrease_k = 0
-        # In the following loop, we find a k-core, and if the k-core includes all query vertices, we increase k to see if (k+1)-core also includes all of them or not. If (k+1)-core includes all query vertices, we continue increasing k, otherwise, we stop there and output the k-core that included all query vertices
-        while must_decrease_k == 0:
-            k += 1
-            make_kcore(k)
-            map_component = detecte_connected_components_inversely()
-            component = map_component[query_vertices[0]]
-            for v in query_vertices:
-                if component != map_component[v]:
-                    must_decrease_k = 1
-            if must_decrease_k == 0:
-                prev_map = map_component
+    def query_kcores(self, query_vertices):
+        query_vertices = [self.get_index(v) for v in query_vertices]
+        index = self.build_core_index()
+        node = index.lowest_common_ancestor(query_vertices)
+        if node == -1:
+            return []
 
         # Get ready to output the community
-        vertices_in_community = [i for i in range(0, len(prev_map)) if prev_map[i]==prev_map[query_vertices[0]]]
+        vertices_in_community = [self.vert_id[i] for i in index.subtree_vertices(node)]
         return vertices_in_community
 
 
 
+    #########################################################################
+    #   Finds the largest k for which a kcore of the subgraph induced by    #
+    #   candidates has all query vertices in one component. Returns k and   #
+    #   the component in terms of original ids, or (0, []) if none.         #
+    #########################################################################
+    def local_kcore(self, candidates, query_vertices):
+        local = list(candidates)
+        local_num = dict((v, i) for i, v in enumerate(local))
+        local_edges = [array('i', [local_num[u] for u in self.edges[v] if u in local_num]) for v in local]
+        index = CoreIndex(local_edges, bin_sort_cores(local_edges))
+        node = index.lowest_common_ancestor([local_num[v] for v in query_vertices])
+        if node == -1:
+            return 0, []
+        return index.node_k[node], [self.vert_id[local[i]] for i in index.subtree_vertices(node)]
+
+
+    #########################################################################
+    #   Local search for the community of the query vertices with maximum   #
+    #   minimum degree (CSM, Cui et al.). Candidates grow outward from the  #
+    #   query, always taking the frontier vertex with the most neighbours   #
+    #   among the candidates. A vertex of degree <= best can never be part  #
+    #   of a better community, so the search stops when no frontier vertex  #
+    #   beats the best community found, or when it reaches the upper bound. #
+    #########################################################################
+    def query_kcores_local(self, query_vertices):
+        query_vertices = [self.get_index(v) for v in query_vertices]
+        edges = self.edges
+        # The minimum degree of a community is at most the degree (or core number) of each query vertex
+        if self.cores is not None:
+            upper = min(self.cores[v] for v in query_vertices)
+        else:
+            upper = min(len(edges[v]) for v in query_vertices)
+
+        candidates = set()
+        links = {}
+        frontier = []
+        best = 0
+        community = []
+        checked = 0
+        to_be_added = list(set(query_vertices))
+        while True:
+            # Add the chosen vertices and push their neighbours to the frontier
+            for w in to_be_added:
+                candidates.add(w)
+                for u in edges[w]:
+                    if u not in candidates and len(edges[u]) > best:
+                        links[u] = links.get(u, 0) + 1
+                        heapq.heappush(frontier, (-links[u], -len(edges[u]), u))
+            to_be_added = []
+
+            # Pick the frontier vertex with the most links; stale entries are skipped
+            w = -1
+            while len(frontier) > 0:
+                neg_links, neg_degree, u = heapq.heappop(frontier)
+                if u in candidates or -neg_links != links[u] or -neg_degree <= best:
+                    continue
+                w = u
+                break
+
+            # Re-evaluate the candidates whenever they have doubled, and before stopping
+            if w == -1 or len(candidates) >= 2 * checked:
+                if checked != len(candidates):
+                    k, members = self.local_kcore(candidates, query_vertices)
+                    checked = len(candidates)
+                    if k > best:
+                        best = k
+                        community = members
+                if best >= upper or w == -1:
+                    break
+                if len(edges[w]) <= best:
+                    continue
+            to_be_added = [w]
+
+        return community
+
+
 
 
 ##### The following piece of code has been used for testing and no longer needed. However, it is kept here for reference
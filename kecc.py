@@ -10,8 +10,19 @@
 
 import sys
 import random
+import cPickle
+import heapq
+import multiprocessing
 from os.path import isfile, join
-import copy
+from array import array
+from itertools import izip
+import csrgraph
+import ksearch
+
+
+# Version of the format of saved kECC indexes; indexes saved by another
+# version (e.g. built by random contraction) are rejected when loaded
+INDEX_VERSION = 2
 
 
 
@@ -178,6 +189,678 @@ class Vertex:
 
 
 
+#########################################################################
+#   Find the root of x in a disjoint-set forest, halving the path       #
+#########################################################################
+def find_root(parent, x):
+    while parent[x] != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+    return x
+
+
+# Snapshot read by the trials in worker processes; set before the pool is
+# forked so that it is not pickled for every trial
+shared_snapshot = None
+
+
+#########################################################################
+#   Worker: one trial of random contraction on the shared snapshot,     #
+#   with its own seed                                                   #
+#########################################################################
+def run_trial(trial):
+    k, seed = trial
+    return ContractionForest(shared_snapshot).decompose(k, random.Random(seed))
+
+
+#########################################################################
+#   Runs independent trials of random contraction, trial i with seed    #
+#   seed+i, in a pool of processes (or here if processes is 1)          #
+#########################################################################
+def run_trials(snapshot, k, trials, processes=None, seed=0):
+    global shared_snapshot
+    jobs = [(k, seed + i) for i in xrange(trials)]
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    shared_snapshot = snapshot
+    try:
+        if processes <= 1 or trials <= 1:
+            results = map(run_trial, jobs)
+        else:
+            pool = multiprocessing.Pool(min(processes, trials))
+            try:
+                results = pool.map(run_trial, jobs)
+                pool.close()
+            finally:
+                pool.terminate()
+                pool.join()
+    finally:
+        shared_snapshot = None
+    return results
+
+
+#########################################################################
+#   Combines the partitions of several trials into their meet: two      #
+#   vertices are together if every trial put them in the same           #
+#   community, and a vertex is kept if every trial put it in some       #
+#   community. A trial never splits or drops a kECC S: while S is not   #
+#   in one super-vertex, a super-vertex X holding part of it has at     #
+#   least k weight to the rest of S, which is still alive, so X is not  #
+#   removed. Every trial then puts each kECC in one community, and so   #
+#   does the meet, which is finer than every trial; joining the trials  #
+#   instead could only merge more kECCs over small cuts. It             #
+#   returns the combined communities and the fraction of trials that    #
+#   found exactly them.                                                 #
+#########################################################################
+def combine_trials(n, results):
+    if len(results) == 0:
+        return [], 0.0
+    # The community of every vertex in every trial, or -1
+    labels = [array('l', [-1]) * n for result in results]
+    for t in xrange(len(results)):
+        for c in xrange(len(results[t])):
+            for v in results[t][c]:
+                labels[t][v] = c
+    groups = {}
+    for v in xrange(n):
+        key = tuple(label[v] for label in labels)
+        if -1 not in key:
+            groups.setdefault(key, []).append(v)
+    communities = groups.values()
+
+    # A trial agrees if its partition is the combined one
+    combined = set(frozenset(community) for community in communities)
+    agree = 0
+    for result in results:
+        if len(result) == len(combined) and all(frozenset(community) in combined for community in result):
+            agree += 1
+    return communities, float(agree) / len(results)
+
+
+
+
+#########################################################################
+#   Immutable flat copy of a weighted graph. Vertices are numbered      #
+#   0..n-1 in the order of ids; every edge is listed once in src, dst   #
+#   and weight, and both of its directions are kept in CSR form, where  #
+#   the neighbours of v are adj[offsets[v]:offsets[v+1]], and adj_edge  #
+#   gives the position of each entry in the edge list. Runs of the      #
+#   decomposition only read it, so it is shared by all of them.         #
+#########################################################################
+class EdgeSnapshot:
+
+    #########################################################################
+    #   Build the snapshot from a list of ids and three parallel arrays     #
+    #########################################################################
+    def __init__(self, ids, src, dst, weight):
+        n = len(ids)
+        self.ids = ids
+        self.src = src
+        self.dst = dst
+        self.weight = weight
+        self.degree = array('l', [0]) * n
+        self.offsets = array('l', [0]) * (n + 1)
+        for e in xrange(len(src)):
+            self.offsets[src[e] + 1] += 1
+            self.offsets[dst[e] + 1] += 1
+            self.degree[src[e]] += weight[e]
+            self.degree[dst[e]] += weight[e]
+        for v in xrange(n):
+            self.offsets[v + 1] += self.offsets[v]
+        self.adj = array('i', [0]) * self.offsets[n]
+        self.adj_weight = array('l', [0]) * self.offsets[n]
+        self.adj_edge = array('l', [0]) * self.offsets[n]
+        fill = self.offsets[:n]
+        for e in xrange(len(src)):
+            for u, v in ((src[e], dst[e]), (dst[e], src[e])):
+                self.adj[fill[u]] = v
+                self.adj_weight[fill[u]] = weight[e]
+                self.adj_edge[fill[u]] = e
+                fill[u] += 1
+
+
+    #########################################################################
+    #   Get the snapshot of the subgraph induced by a list of vertices; the #
+    #   i-th vertex of the list becomes vertex i of the new snapshot        #
+    #########################################################################
+    def induced(self, vertices):
+        local = dict((v, i) for i, v in enumerate(vertices))
+        src = array('i')
+        dst = array('i')
+        weight = array('l')
+        for i in xrange(len(vertices)):
+            v = vertices[i]
+            for a in xrange(self.offsets[v], self.offsets[v + 1]):
+                j = local.get(self.adj[a], -1)
+                if j > i:
+                    src.append(i)
+                    dst.append(j)
+                    weight.append(self.adj_weight[a])
+        return EdgeSnapshot([self.ids[v] for v in vertices], src, dst, weight)
+
+
+    #########################################################################
+    #   Removes the vertices of weighted degree less than k, one after the  #
+    #   other, and returns the connected components of what is left         #
+    #########################################################################
+    def kcore_components(self, k):
+        n = len(self.ids)
+        offsets = self.offsets
+        adj = self.adj
+        degree = self.degree[:]
+        alive = array('b', [1]) * n
+        to_be_removed = [v for v in xrange(n) if degree[v] < k]
+        for v in to_be_removed:
+            alive[v] = 0
+        while len(to_be_removed) > 0:
+            u = to_be_removed.pop()
+            for a in xrange(offsets[u], offsets[u + 1]):
+                w = adj[a]
+                degree[w] -= self.adj_weight[a]
+                if alive[w] and degree[w] < k:
+                    alive[w] = 0
+                    to_be_removed.append(w)
+
+        components = []
+        for v in xrange(n):
+            if not alive[v]:
+                continue
+            component = [v]
+            alive[v] = 0
+            qq = 0
+            while qq < len(component):
+                u = component[qq]
+                for a in xrange(offsets[u], offsets[u + 1]):
+                    w = adj[a]
+                    if alive[w]:
+                        alive[w] = 0
+                        component.append(w)
+                qq += 1
+            components.append(component)
+        return components
+
+
+    #########################################################################
+    #   Minimum cut search stopped at the first cut of weight less than k.  #
+    #   Every phase orders the vertices by maximum adjacency; the last      #
+    #   vertex t is cut off by the weight of t, so if that is less than k   #
+    #   the cut is found. Otherwise every pair the phase proves to be       #
+    #   k-edge-connected (see maximum_adjacency) is merged, which keeps all #
+    #   cuts of weight less than k. Returns the vertices on one side of a   #
+    #   cut of weight less than k, or None if the graph is k-connected.     #
+    #########################################################################
+    def small_cut(self, k):
+        nbrs, members, active = self.cut_graph()
+        while len(active) > 1:
+            order, weight, joined = maximum_adjacency(nbrs, active, k)
+            if len(order) < len(active):
+                # Not connected; what was reached is cut off by no edge
+                return [v for u in order for v in members[u]]
+            t = order[-1]
+            if weight[t] < k:
+                return members[t]
+            merge_pairs(nbrs, members, active, joined)
+        return None
+
+
+    #########################################################################
+    #   Minimum cut, found as in small_cut with the threshold lowered to    #
+    #   the lightest cut seen so far: a single vertex at first, and then    #
+    #   the last vertex of every phase, which is also merged into the one   #
+    #   before it as in Stoer-Wagner. Returns the weight of the cut and the #
+    #   vertices on one side of it, or (0, None) for less than 2 vertices.  #
+    #########################################################################
+    def min_cut(self):
+        nbrs, members, active = self.cut_graph()
+        if len(active) < 2:
+            return 0, None
+        side = min(active, key=lambda v: sum(nbrs[v].itervalues()))
+        best = sum(nbrs[side].itervalues())
+        side = [side]
+        while len(active) > 1:
+            order, weight, joined = maximum_adjacency(nbrs, active, best)
+            if len(order) < len(active):
+                return 0, [v for u in order for v in members[u]]
+            t = order[-1]
+            if weight[t] < best:
+                best = weight[t]
+                side = list(members[t])
+            joined.append((order[-2], t))
+            merge_pairs(nbrs, members, active, joined)
+        return best, side
+
+
+    #########################################################################
+    #   Dictionaries of weighted neighbours, lists of members and the set   #
+    #   of active vertices that the minimum cut searches start from         #
+    #########################################################################
+    def cut_graph(self):
+        n = len(self.ids)
+        offsets = self.offsets
+        nbrs = [dict(izip(self.adj[offsets[v]:offsets[v + 1]], self.adj_weight[offsets[v]:offsets[v + 1]])) for v in xrange(n)]
+        members = [[v] for v in xrange(n)]
+        return nbrs, members, set(xrange(n))
+
+
+
+
+#########################################################################
+#   One maximum adjacency phase over the active vertices: they are      #
+#   added in order of their weight to the ones added before, which is   #
+#   returned with the order. Only the component of the first vertex is  #
+#   reached. As in the sparse certificate of Nagamochi and Ibaraki, an  #
+#   edge uy scanned from u while y has weight r takes the forests       #
+#   r+1..r+w, and its endpoints are at least r+w-edge-connected; the    #
+#   pairs with r+w >= k are returned as joined. So every cut search     #
+#   only merges what the first k forests of the certificate connect.    #
+#########################################################################
+def maximum_adjacency(nbrs, active, k):
+    start = next(iter(active))
+    weight = dict((v, 0) for v in active)
+    added = set()
+    order = []
+    joined = []
+    heap = [(0, start)]
+    while len(heap) > 0:
+        wu, u = heapq.heappop(heap)
+        if u in added or -wu != weight[u]:
+            continue
+        added.add(u)
+        order.append(u)
+        for y, w in nbrs[u].iteritems():
+            if y not in added:
+                weight[y] += w
+                if weight[y] >= k:
+                    joined.append((u, y))
+                heapq.heappush(heap, (-weight[y], y))
+    return order, weight, joined
+
+
+#########################################################################
+#   Merge the active vertices of every pair, adding up parallel edges;  #
+#   a disjoint-set forest tracks which vertex each one was merged into  #
+#########################################################################
+def merge_pairs(nbrs, members, active, pairs):
+    parent = {}
+    for a, t in pairs:
+        a = find_merged(parent, a)
+        t = find_merged(parent, t)
+        if a == t:
+            continue
+        if len(nbrs[a]) < len(nbrs[t]):
+            a, t = t, a
+        nbrs_a = nbrs[a]
+        nbrs_a.pop(t, None)
+        for y, w in nbrs[t].iteritems():
+            if y != a:
+                nbrs_y = nbrs[y]
+                del nbrs_y[t]
+                nbrs_y[a] = nbrs_y.get(a, 0) + w
+                nbrs_a[y] = nbrs_a.get(y, 0) + w
+        nbrs[t] = {}
+        members[a].extend(members[t])
+        members[t] = None
+        active.remove(t)
+        parent[t] = a
+
+
+#########################################################################
+#   Find the vertex x was merged into, in a forest kept as a dictionary #
+#########################################################################
+def find_merged(parent, x):
+    while x in parent:
+        x = parent[x]
+    return x
+
+
+
+
+#########################################################################
+#   Random contraction over the edges of a snapshot. Super-vertices are #
+#   kept in a disjoint-set forest over the snapshot vertices, with the  #
+#   weighted degree of each root; the edges themselves are only read    #
+#   from the snapshot, and the members of a root are only listed once   #
+#   something was contracted into it.                                   #
+#########################################################################
+class ContractionForest:
+
+    #########################################################################
+    #   Initialize singleton super-vertices over a snapshot. Everything a   #
+    #   run changes is kept here, so the snapshot itself is never modified. #
+    #########################################################################
+    def __init__(self, snapshot):
+        n = len(snapshot.ids)
+        self.n = n
+        self.snapshot = snapshot
+        self.parent = array('i', xrange(n))
+        self.alive = array('b', [1]) * n
+        self.degree = snapshot.degree[:]
+        self.members = {}
+
+
+    #########################################################################
+    #   Get the members of the root r                                       #
+    #########################################################################
+    def get_members(self, r):
+        return self.members.get(r, [r])
+
+
+    #########################################################################
+    #   Remove the super-vertex r, and then every super-vertex whose        #
+    #   weighted degree drops below k. Only the degrees of the roots still  #
+    #   alive are updated. Returns the removed roots, r first.              #
+    #########################################################################
+    def remove(self, r, k):
+        offsets = self.snapshot.offsets
+        adj = self.snapshot.adj
+        adj_weight = self.snapshot.adj_weight
+        parent = self.parent
+        alive = self.alive
+        degree = self.degree
+        alive[r] = 0
+        removed = []
+        to_be_removed = [r]
+        while len(to_be_removed) > 0:
+            x = to_be_removed.pop()
+            removed.append(x)
+            for v in self.get_members(x):
+                for a in xrange(offsets[v], offsets[v + 1]):
+                    y = find_root(parent, adj[a])
+                    if alive[y]:
+                        degree[y] -= adj_weight[a]
+                        if degree[y] < k:
+                            alive[y] = 0
+                            to_be_removed.append(y)
+        return removed
+
+
+    #########################################################################
+    #   Merge the super-vertices a and b (both roots); the one with fewer   #
+    #   members is moved into the other, and the new root is returned. The  #
+    #   weight between them is counted on the edges of the smaller one.     #
+    #########################################################################
+    def contract(self, a, b):
+        members_a = self.get_members(a)
+        members_b = self.get_members(b)
+        if len(members_a) > len(members_b):
+            a, b = b, a
+            members_a, members_b = members_b, members_a
+        offsets = self.snapshot.offsets
+        adj = self.snapshot.adj
+        adj_weight = self.snapshot.adj_weight
+        parent = self.parent
+        w_ab = 0
+        for v in members_a:
+            for i in xrange(offsets[v], offsets[v + 1]):
+                if find_root(parent, adj[i]) == b:
+                    w_ab += adj_weight[i]
+        self.degree[b] += self.degree[a] - 2 * w_ab
+        parent[a] = b
+        if len(members_b) == 1:
+            members_b = self.members[b] = [b]
+        members_b.extend(members_a)
+        self.members.pop(a, None)
+        return b
+
+
+    #########################################################################
+    #   One pass of random contraction. Vertices of weighted degree less    #
+    #   than k are removed first (k-core). Then the edges are contracted in #
+    #   a random order; once a super-vertex has weighted degree less than k #
+    #   it is removed together with the super-vertices that fall below k    #
+    #   because of it, and the members of each one that was contracted are  #
+    #   output as a community; a super-vertex may hold a whole kECC when    #
+    #   it falls. It returns the communities as lists of vertices 0..n-1.   #
+    #########################################################################
+    def decompose(self, k, rng=random):
+        for v in xrange(self.n):
+            if self.alive[v] and self.degree[v] < k:
+                self.remove(v, k)
+
+        communities = []
+        src = self.snapshot.src
+        dst = self.snapshot.dst
+        order = range(len(src))
+        rng.shuffle(order)
+        for e in order:
+            u = find_root(self.parent, src[e])
+            v = find_root(self.parent, dst[e])
+            if u == v or not self.alive[u] or not self.alive[v]:
+                continue
+            r = self.contract(u, v)
+            if self.degree[r] < k:
+                for x in self.remove(r, k):
+                    members = self.get_members(x)
+                    if len(members) > 1:
+                        communities.append(members)
+
+        # Only left with k <= 0, where nothing is ever removed
+        for v in xrange(self.n):
+            if self.alive[v] and self.parent[v] == v:
+                communities.append(self.get_members(v))
+                self.alive[v] = 0
+        return communities
+
+
+
+
+#########################################################################
+#   Exact kECCs of a snapshot. Vertices of weighted degree less than k  #
+#   are removed, and every connected component of the rest is checked   #
+#   with small_cut; a component with a cut of weight less than k is     #
+#   split along it and both sides are checked again. No kECC crosses    #
+#   such a cut, so the components that pass are exactly the kECCs.      #
+#   Candidates, e.g. from random contraction, can be given as lists of  #
+#   vertices to only check and split them.                              #
+#########################################################################
+def exact_kecc(snapshot, k, candidates=None):
+    communities = []
+    if candidates is None:
+        candidates = [range(len(snapshot.ids))]
+    stack = list(candidates)
+    while len(stack) > 0:
+        vertices = stack.pop()
+        sub = snapshot.induced(vertices)
+        for component in sub.kcore_components(k):
+            if len(component) < 2:
+                continue
+            component = [vertices[v] for v in component]
+            part = snapshot.induced(component)
+            side = part.small_cut(k)
+            if side is None:
+                communities.append(component)
+                continue
+            in_side = array('b', [0]) * len(component)
+            for v in side:
+                in_side[v] = 1
+            stack.append([component[v] for v in xrange(len(component)) if in_side[v]])
+            stack.append([component[v] for v in xrange(len(component)) if not in_side[v]])
+    return communities
+
+
+
+
+#########################################################################
+#   Finds the kECCs of a snapshot by random contraction, or exactly by  #
+#   minimum cuts; see Graph.decompose_kecc for the options              #
+#########################################################################
+def decompose_snapshot(snapshot, k, verify=False, exact=False, rng=random):
+    if exact:
+        return exact_kecc(snapshot, k)
+    communities = ContractionForest(snapshot).decompose(k, rng)
+    if verify:
+        communities = exact_kecc(snapshot, k, communities)
+    return communities
+
+
+
+
+#########################################################################
+#   kECC hierarchy. The kECCs of a graph are nested, so they form a     #
+#   forest: a node is a set of vertices that is a kECC for k up to      #
+#   node_k, and its children are the (node_k+1)-ECCs found inside it.   #
+#   Each vertex is kept in the deepest node that contains it, so the    #
+#   members of a kECC are the vertices in the subtree of its node.      #
+#########################################################################
+class KECCIndex:
+
+    #########################################################################
+    #   Initialize an empty index                                           #
+    #########################################################################
+    def __init__(self):
+        self.ids = []
+        self.vert_num = {}
+        self.node_k = array('i')
+        self.node_parent = array('l')
+        self.vertex_node = array('l')
+        self.node_vertices = []
+        self.node_children = []
+
+
+    #########################################################################
+    #   Builds the index from a snapshot. The 1-ECCs are the connected      #
+    #   components. A node is a kECC for every k up to the weight of the    #
+    #   minimum cut of the subgraph induced by its vertices, so node_k is   #
+    #   set to that weight at once; the (node_k+1)-ECCs inside it are then  #
+    #   found exactly (see exact_kecc) on both sides of that cut, which no  #
+    #   (node_k+1)-ECC crosses. Random contraction is not used, as the      #
+    #   index is saved and answers every later query.                       #
+    #########################################################################
+    def build(self, snapshot):
+        n = len(snapshot.ids)
+        self.ids = snapshot.ids
+        self.vert_num = dict((node, i) for i, node in enumerate(self.ids))
+        self.node_k = array('i')
+        self.node_parent = array('l')
+        self.vertex_node = array('l', [-1]) * n
+        self.node_vertices = []
+        self.node_children = []
+
+        # Nodes still to be split, with their vertices
+        stack = []
+        for community in exact_kecc(snapshot, 1):
+            stack.append((self.add_node(1, -1, community), community))
+        while len(stack) > 0:
+            node, vertices = stack.pop()
+            sub = snapshot.induced(vertices)
+            cut, side = sub.min_cut()
+            self.node_k[node] = cut
+            in_side = array('b', [0]) * len(vertices)
+            for v in side:
+                in_side[v] = 1
+            halves = [[v for v in xrange(len(vertices)) if in_side[v] == flag] for flag in (1, 0)]
+            for community in exact_kecc(sub, self.node_k[node] + 1, halves):
+                community = [vertices[v] for v in community]
+                stack.append((self.add_node(self.node_k[node] + 1, node, community), community))
+        self.fill_node_vertices()
+        return self
+
+
+    #########################################################################
+    #   Add a node with the given vertices below parent (-1 for a root)     #
+    #########################################################################
+    def add_node(self, k, parent, vertices):
+        node = len(self.node_k)
+        self.node_k.append(k)
+        self.node_parent.append(parent)
+        for v in vertices:
+            self.vertex_node[v] = node
+        return node
+
+
+    #########################################################################
+    #   Fill the lists of children and vertices of nodes from the arrays    #
+    #########################################################################
+    def fill_node_vertices(self):
+        self.node_vertices = [[] for node in xrange(len(self.node_k))]
+        self.node_children = [[] for node in xrange(len(self.node_k))]
+        for node in xrange(len(self.node_k)):
+            if self.node_parent[node] != -1:
+                self.node_children[self.node_parent[node]].append(node)
+        for v in xrange(len(self.vertex_node)):
+            if self.vertex_node[v] != -1:
+                self.node_vertices[self.vertex_node[v]].append(v)
+
+
+    #########################################################################
+    #   Saves the index to a file with cPickle                              #
+    #########################################################################
+    def save(self, index_file):
+        arrays = {}
+        for name in ('node_k', 'node_parent', 'vertex_node'):
+            arr = getattr(self, name)
+            arrays[name] = (arr.typecode, arr.tostring())
+        with open(index_file, 'wb') as f:
+            cPickle.dump((INDEX_VERSION, self.ids, arrays), f, cPickle.HIGHEST_PROTOCOL)
+
+
+    #########################################################################
+    #   Loads the index from a file written by save; it raises ValueError   #
+    #   if the file was saved by another version                            #
+    #########################################################################
+    def load(self, index_file):
+        with open(index_file, 'rb') as f:
+            saved = cPickle.load(f)
+        if len(saved) != 3 or saved[0] != INDEX_VERSION:
+            raise ValueError, "The kECC index in %s is out of date; build it again" % index_file
+        version, self.ids, arrays = saved
+        self.vert_num = dict((node, i) for i, node in enumerate(self.ids))
+        for name in arrays:
+            typecode, data = arrays[name]
+            arr = array(typecode)
+            arr.fromstring(data)
+            setattr(self, name, arr)
+        self.fill_node_vertices()
+        return self
+
+
+    #########################################################################
+    #   Finds the lowest common ancestor of the nodes of given vertices.    #
+    #   It returns -1 if some vertex is in no node, or if the vertices are  #
+    #   in different trees.                                                 #
+    #########################################################################
+    def lowest_common_ancestor(self, vertices):
+        nodes = set(self.vertex_node[v] for v in vertices)
+        if -1 in nodes:
+            return -1
+        # A parent always has a smaller k, so we lift the node with the largest k
+        while len(nodes) > 1:
+            node = max(nodes, key=lambda x: self.node_k[x])
+            nodes.remove(node)
+            if self.node_parent[node] == -1:
+                return -1
+            nodes.add(self.node_parent[node])
+        return nodes.pop()
+
+
+    #########################################################################
+    #   Returns the vertices in the subtree of a node                       #
+    #########################################################################
+    def subtree_vertices(self, node):
+        vertices = []
+        stack = [node]
+        while len(stack) > 0:
+            x = stack.pop()
+            vertices += self.node_vertices[x]
+            stack += self.node_children[x]
+        return vertices
+
+
+    #########################################################################
+    #   Finds the kECC with the largest k that contains all query vertices  #
+    #   and returns k and its vertices, or (0, []) if there is none         #
+    #########################################################################
+    def query(self, query):
+        if len(query) == 0 or any(q not in self.vert_num for q in query):
+            return 0, []
+        node = self.lowest_common_ancestor([self.vert_num[q] for q in query])
+        if node == -1:
+            return 0, []
+        return self.node_k[node], [self.ids[v] for v in self.subtree_vertices(node)]
+
+
+
+
 #########################################################################
 #   Graph class is designed to handle operations on graph               #
 #########################################################################
@@ -191,19 +874,31 @@ class Graph:
         self.vert_dict = {}
         self.vert_num = {}
         self.num_vertices = 0
+        # Flat copy of the graph for the decomposition, built on demand
+        self.snapshot = None
+        # kECC hierarchy, built on demand or loaded from a file
+        self.kecc_index = None
+        # The file the graph was read from; the index is saved next to it
+        self.graph_file = None
 
 
     #########################################################################
     #   Read the list of edges of a graph from a file                       #
     #########################################################################
-    def read_graph(self, graph_file):
+    def read_graph(self, graph_file, cache=None):
         """ Add connections (list of tuple pairs) to graph """
 
-        with open(graph_file) as gf:
-            for line in gf:
-                e = [int(v) for v in line.split()]
-                self.add_edge(e[0], e[1])
-        gf.close()
+        csr = csrgraph.CSRGraph()
+        csr.read_graph(graph_file, cache)
+        self.read_csr(csr)
+        self.graph_file = graph_file
+
+
+    #########################################################################
+    #   Add the vertices and edges of a graph loaded in CSR form            #
+    #########################################################################
+    def read_csr(self, csr, weight = 1):
+        csr.fill_graph(self, weight)
 
 
     #########################################################################
@@ -217,6 +912,8 @@ class Graph:
     #   Add a vertex to the graph                                           #
     #########################################################################
     def add_vertex(self, node):
+        self.snapshot = None
+        self.kecc_index = None
         self.num_vertices = self.num_vertices + 1
         new_vertex = Vertex(node)
         self.vert_dict[node] = new_vertex
@@ -247,6 +944,8 @@ class Graph:
 
         self.vert_dict[frm].add_neighbor(self.vert_dict[to], cap)
         self.vert_dict[to].add_neighbor(self.vert_dict[frm], cap)
+        self.snapshot = None
+        self.kecc_index = None
 
 
     #########################################################################
@@ -258,6 +957,8 @@ class Graph:
         if self.is_connected(frm, to):
             self.vert_dict[frm].remove_neighbor(self.vert_dict[to])
             self.vert_dict[to].remove_neighbor(self.vert_dict[frm])
+            self.snapshot = None
+            self.kecc_index = None
 
 
     #########################################################################
@@ -306,6 +1007,8 @@ class Graph:
         if self.is_connected(node1, node2):
             #self.vert_dict[node1].adjacent[self.vert_dict[node2]] = new_weight
             self.vert_dict[node1].update_weight(self.vert_dict[node2], new_weight)
+            self.snapshot = None
+            self.kecc_index = None
             return self.vert_dict[node1].get_weight(self.vert_dict[node2])
         else:
             return -1
@@ -317,6 +1020,8 @@ class Graph:
     #########################################################################
     def increment_weight(self, node1, node2, inc_by = 1):
         self.vert_dict[node1].increment_weight(self.vert_dict[node2], inc_by)
+        self.snapshot = None
+        self.kecc_index = None
         #if self.is_connected(node1, node2):
         #    self.vert_dict[node1].adjacent[self.vert_dict[node2]] += inc_by
         #    return self.vert_dict[node1].adjacent.get(self.vert_dict[node2])
@@ -410,6 +1115,8 @@ class Graph:
                 if (w.get_sum_weights() < k):
                     to_be_removed.append(w.get_id())
             del self.vert_dict[u]
+            self.snapshot = None
+            self.kecc_index = None
             # Do we want to output u as a community?
             #print u
 
@@ -436,6 +1143,8 @@ class Graph:
                 if w.get_sum_weights() < k:
                     to_be_removed.append(w.get_id())
             del self.vert_dict[u]
+            self.snapshot = None
+            self.kecc_index = None
             # Do we want to output u as a community?
             #print u
 
@@ -465,87 +1174,167 @@ class Graph:
             self.remove_edge(u, w.get_id())
             self.remove_edge(w.get_id(), u)
         del self.vert_dict[u]
+        self.snapshot = None
+        self.kecc_index = None
         return v
 
 
+    #########################################################################
+    #   Get the flat snapshot of the graph (see EdgeSnapshot). It is kept   #
+    #   until the graph is modified through this class.                     #
+    #########################################################################
+    def edge_snapshot(self):
+        if self.snapshot is not None:
+            return self.snapshot
+        ids = self.vert_dict.keys()
+        index = dict((self.vert_dict[node], i) for i, node in enumerate(ids))
+        src = array('i')
+        dst = array('i')
+        weight = array('l')
+        for i in xrange(len(ids)):
+            # Sorted, so that the edges do not depend on where the vertices
+            # are in memory and a seeded trial always contracts the same way
+            for j, cap in sorted((index[w], cap) for w, cap in self.vert_dict[ids[i]].adjacent.iteritems()):
+                if j > i:
+                    src.append(i)
+                    dst.append(j)
+                    weight.append(cap)
+        self.snapshot = EdgeSnapshot(ids, src, dst, weight)
+        return self.snapshot
+
+
     #########################################################################
     #   Finds k-edge-connected components of the graph using random         #
-    #   contraction. In each round, an edge is randomly selected and it is  #
-    #   contracted. If the degree of the resulting vertex is less than k,   #
-    #   it gets removed from network.                                       #
+    #   contraction. The edges are contracted in a random order in a        #
+    #   disjoint-set forest (see ContractionForest); once the weighted      #
+    #   degree of a contracted vertex is less than k, it is output as a     #
+    #   community and removed from network. The graph is not modified; a    #
+    #   run only changes its own forest over the shared snapshot. A         #
+    #   community may join kECCs that are contracted over a small cut; with #
+    #   verify, every community found is checked by minimum cuts (see       #
+    #   exact_kecc) and split until its parts are k-edge-connected. With    #
+    #   exact, the k-core components are checked and split the same way,    #
+    #   without contraction.                                                #
     #########################################################################
-    def decompose_kecc(self, k):
-        # First decompose the graph into kcores
-        #self.print_graph()
-        communities = []
-        self.decompose_kcore(k)
-        #uv = [('h','g'), ('a','c'), ('j','i'), ('b','c'), ('c','d'), ('i','g')]
-        #kk = -1
-        while (len(self.vert_dict) > 1): # 1 will be replaced with a condition on the number of edges
-            # randomly pick an edge
-            #self.print_edges()
-            u = random.randrange(0, len(self.vert_dict))
-            u = self.vert_dict.keys()[u]
-            v = random.randrange(0, self.vert_dict[u].get_num_neighbors())
-            v = self.vert_dict[u].get_neighbor(v).get_id()
-            #kk += 1
-            #u = uv[kk][0]
-            #v = uv[kk][1]
-            # contract the randomly selected edge
-            #print u, v
-            if u == v:
-                self.remove_edge(self.vert_dict[u], self.vert_dict[v])
-                print "An exception happened here; We found a self loop"
-                continue
-            # v is the remaining vertex after contraction
-            v = self.contract_edge(self.vert_dict[u], self.vert_dict[v])
-            if self.vert_dict[v].get_sum_weights() < k:
-                #print self.vert_dict[v].get_contracted()
-                communities.append(self.vert_dict[v].get_contracted())
-                self.decompose_kcore_by_vertex(k, v)
-            #self.print_graph()
-            #print "--------"
-            #self.print_edges()
-            # remove the updated vertex if its degree is less than k
-            #break
-            # if the degree of resulting vertex is less than k cut it
-        #print "Resulted int he graph"
-        #self.print_graph()
-        #print self.vert_dict.values()[0].get_contracted()
-        return communities
+    def decompose_kecc(self, k, verify=False, exact=False):
+        snapshot = self.edge_snapshot()
+        communities = decompose_snapshot(snapshot, k, verify, exact)
+        return [[snapshot.ids[v] for v in community] for community in communities]
+
+
+    #########################################################################
+    #   Same as decompose_kecc, but with several independent trials run in  #
+    #   a pool of processes; trial i uses the seed seed+i. A single trial   #
+    #   may join kECCs over a small cut by chance, so the communities that  #
+    #   all trials agree on are returned (see combine_trials), with the     #
+    #   fraction of trials that found exactly them. Every kECC is still in  #
+    #   one of them, but they are only exact with verify.                   #
+    #   With verify, the combined communities are checked as in             #
+    #   decompose_kecc.                                                     #
+    #########################################################################
+    def decompose_kecc_trials(self, k, trials, processes=None, seed=0, verify=False):
+        snapshot = self.edge_snapshot()
+        results = run_trials(snapshot, k, trials, processes, seed)
+        communities, confidence = combine_trials(len(snapshot.ids), results)
+        if verify:
+            communities = exact_kecc(snapshot, k, communities)
+        return [[snapshot.ids[v] for v in community] for community in communities], confidence
+
+
+    #########################################################################
+    #   Checks a candidate community, e.g. one returned by decompose_kecc,  #
+    #   by minimum cuts and returns the exact kECCs inside it               #
+    #########################################################################
+    def verify_kecc(self, community, k):
+        snapshot = self.edge_snapshot()
+        index = dict((node, i) for i, node in enumerate(snapshot.ids))
+        vertices = [index[node] for node in community if node in index]
+        communities = exact_kecc(snapshot, k, [vertices])
+        return [[snapshot.ids[v] for v in c] for c in communities]
+
+
+    #########################################################################
+    #   Builds the kECC hierarchy of the graph (see KECCIndex), or returns  #
+    #   the one already built or loaded                                     #
+    #########################################################################
+    def build_kecc_index(self):
+        if self.kecc_index is None:
+            self.kecc_index = KECCIndex().build(self.edge_snapshot())
+        return self.kecc_index
+
+
+    #########################################################################
+    #   Get the file of the index; by default, next to the graph file       #
+    #########################################################################
+    def kecc_index_file(self, index_file=None):
+        if index_file is None:
+            if self.graph_file is None:
+                raise ValueError, "The graph was not read from a file; give index_file"
+            index_file = self.graph_file + '.kecc'
+        return index_file
 
 
     #########################################################################
-    #   This is finding kECC for different values of k until there is not a #
-    #   connected component that contains all query vertices                #
-    #########################################################################
-    def query_kecc(self, query):
-        k = 0
-        must_increase_k = True
-        community = []
-        vert_dict_copy = copy.deepcopy(self.vert_dict)
-        while must_increase_k:
-            k += 1
-            # Let's decompose the graph into kECC
-            communities = self.decompose_kecc(k)
-            rcomponents = {}
-            for i in range(0, len(communities)):
-                for vertex in communities[i]:
-                    rcomponents[vertex] = i
-            if rcomponents.has_key(query[0]):
-                t = rcomponents[query[0]]
-            for q in query:
-                if not rcomponents.has_key(q):
-                    must_increase_k = False
-                elif rcomponents[q] != t:
-                    must_increase_k = False
-            if must_increase_k:
-                community = communities[rcomponents[query[0]]]
-            self.vert_dict = copy.deepcopy(vert_dict_copy)
+    #   Saves the kECC hierarchy to a file                                  #
+    #########################################################################
+    def save_kecc_index(self, index_file=None):
+        self.build_kecc_index().save(self.kecc_index_file(index_file))
+
+
+    #########################################################################
+    #   Loads the kECC hierarchy from a file; queries can be answered from  #
+    #   it without reading the graph                                        #
+    #########################################################################
+    def load_kecc_index(self, index_file=None):
+        self.kecc_index = KECCIndex().load(self.kecc_index_file(index_file))
 
+
+    #########################################################################
+    #   Finds the kECC with the largest k that contains all query vertices  #
+    #   by decompositions (see query_kecc_by_decomposition). If the kECC    #
+    #   hierarchy has been built or loaded (build_kecc_index and            #
+    #   load_kecc_index), the query is a lowest common ancestor lookup in   #
+    #   it instead; it is never built here, as that takes much longer than  #
+    #   a query.                                                            #
+    #########################################################################
+    def query_kecc(self, query, exact=False):
+        if self.kecc_index is None:
+            return self.query_kecc_by_decomposition(query, exact)
+        k, community = self.kecc_index.query(query)
         return community
 
 
+    #########################################################################
+    #   Finds the kECC with the largest k that contains all query vertices  #
+    #   by decompositions, without the index. The largest k is found by     #
+    #   galloping and binary search (see ksearch), and as kECCs are nested, #
+    #   every decomposition runs on the kECC of the last k that was found.  #
+    #########################################################################
+    def query_kecc_by_decomposition(self, query, exact=False):
+        snapshot = self.edge_snapshot()
+        index = dict((node, i) for i, node in enumerate(snapshot.ids))
+        if len(query) == 0 or any(q not in index for q in query):
+            return []
+        query = [index[q] for q in query]
+
+        # The kECC of the query for k, found in the kECC of a smaller k
+        def feasible(k, vertices):
+            sub = snapshot.induced(vertices)
+            for community in decompose_snapshot(sub, k, exact=exact):
+                community = [vertices[v] for v in community]
+                members = set(community)
+                if all(q in members for q in query):
+                    return community
+            return None
+
+        # No kECC has k above the smallest weighted degree of the query
+        high = min(snapshot.degree[q] for q in query)
+        k, community = ksearch.search_max_k(feasible, 0, high, range(len(snapshot.ids)))
+        if k == 0:
+            return []
+        return [snapshot.ids[v] for v in community]
+
+
 
 
 
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+#########################################################################
+#   This code finds the largest k for which a community query still has #
+#   an answer. k-cores, k-trusses and kECCs are nested, so if the query #
+#   vertices are together for some k, they are together for all         #
+#   smaller k. Instead of trying k = 1, 2, ... one after the other, k   #
+#   is doubled (galloping) until the query fails, and then the gap is   #
+#   closed by binary search, which takes O(log k) decompositions.       #
+#   Author: Mojtaba (Omid) Rezvani                                      #
+#########################################################################
+
+import sys
+
+
+
+
+#########################################################################
+#   Finds the largest k in [low, high] for which feasible holds.        #
+#   feasible(k, state) gets the state of the largest k known to be      #
+#   feasible so far (e.g. its community, to run the next decomposition  #
+#   on it instead of on the whole graph) and returns the state of k, or #
+#   None if k is not feasible. low is taken as feasible with the given  #
+#   state; high may be None if there is no upper bound. By default, k   #
+#   gallops up from low; with from_top, it gallops down from high,      #
+#   which is better when small k are more expensive to test. It returns #
+#   the largest feasible k and its state.                               #
+#########################################################################
+def search_max_k(feasible, low=0, high=None, state=None, from_top=False):
+    failed = None
+    step = 1
+    if from_top:
+        # Gallop down: try high, high-1, high-3, ... until a k holds
+        k = high
+        while k > low:
+            result = feasible(k, state)
+            if result is not None:
+                low = k
+                state = result
+                break
+            failed = k
+            k = high - (2 * step - 1)
+            step *= 2
+    else:
+        # Gallop up: try low+1, low+2, low+4, ... until a k fails
+        while high is None or low < high:
+            k = low + step
+            if high is not None and k > high:
+                k = high
+            result = feasible(k, state)
+            if result is None:
+                failed = k
+                break
+            low = k
+            state = result
+            step *= 2
+    if failed is None or failed <= low:
+        return low, state
+
+    # Binary search between the last feasible k and the first failed one
+    while failed - low > 1:
+        k = (low + failed) // 2
+        result = feasible(k, state)
+        if result is None:
+            failed = k
+        else:
+            low = k
+            state = result
+    return low, state
@@ -10,6 +10,24 @@
 
 import sys
 from os.path import isfile, join
+from array import array
+import cPickle
+import csrgraph
+import triangles
+import ksearch
+
+
+
+
+#########################################################################
+#   Finds the root of x in a union-find stored as a list of parents,    #
+#   halving the path on the way                                         #
+#########################################################################
+def find_root(parent, x):
+    while parent[x] != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+    return x
 
 
 
@@ -87,19 +105,50 @@ class Graph:
         self.vert_dict = {}
         self.vert_num = {}
         self.num_vertices = 0
+        # Result of truss_decomposition and the TCP index built on it;
+        # both are dropped whenever edges change
+        self.truss_csr = None
+        self.trussness = None
+        self.tcp_index = None
 
 
     #########################################################################
     #   Read the list of edges of a graph from a file                       #
     #########################################################################
-    def read_graph(self, graph_file):
+    def read_graph(self, graph_file, cache=None):
         """ Add connections (list of tuple pairs) to graph """
 
-        with open(graph_file) as gf:
-            for line in gf:
-                e = [int(v) for v in line.split()]
-                self.add_edge(e[0], e[1])
-        gf.close()
+        csr = csrgraph.CSRGraph()
+        csr.read_graph(graph_file, cache)
+        self.read_csr(csr)
+
+
+    #########################################################################
+    #   Add the vertices and edges of a graph loaded in CSR form            #
+    #########################################################################
+    def read_csr(self, csr, weight = 0):
+        csr.fill_graph(self, weight)
+        self.truss_csr = None
+        self.tcp_index = None
+
+
+    #########################################################################
+    #   Take a CSR snapshot of the current edges; dense ids are vert_num    #
+    #########################################################################
+    def to_csr(self):
+        ids = [None] * self.num_vertices
+        for node in self.vert_num:
+            ids[self.vert_num[node]] = node
+        src = []
+        dst = []
+        for v in self:
+            for w in v.get_connections():
+                if self.vert_num[v.get_id()] < self.vert_num[w.get_id()]:
+                    src.append(v.get_id())
+                    dst.append(w.get_id())
+        csr = csrgraph.CSRGraph()
+        csr.build(src, dst, ids)
+        return csr
 
 
     #########################################################################
@@ -143,6 +192,8 @@ class Graph:
 
         self.vert_dict[frm].add_neighbor(self.vert_dict[to], cost)
         self.vert_dict[to].add_neighbor(self.vert_dict[frm], cost)
+        self.truss_csr = None
+        self.tcp_index = None
 
 
     #########################################################################
@@ -154,6 +205,8 @@ class Graph:
         if self.is_connected(frm, to):
             self.vert_dict[frm].remove_neighbor(self.vert_dict[to])
             self.vert_dict[to].remove_neighbor(self.vert_dict[frm])
+            self.truss_csr = None
+            self.tcp_index = None
 
 
     #########################################################################
@@ -214,74 +267,156 @@ class Graph:
 
 
     #########################################################################
-    #   Counts the number of trianges formed by every edge by considering   #
-    #   the number of common neighbors of endpoints of each edge            #
-    #########################################################################
-    def count_triangles(self):
-        # Let's count the number of triangles
-        marked = [0] * self.num_vertices
-        for v in self:
-            for w in v.get_connections():
-                marked[self.vert_num[w.get_id()]] = 1
-            for w in v.get_connections():
-                if self.vert_num[v.get_id()] < self.vert_num[w.get_id()]:
-                    kk = 0
-                    for y in w.get_connections():
-                        if marked[self.vert_num[y.get_id()]] > 0:
-                            kk += 1
-                    self.update_weight(v.get_id(), w.get_id(), kk)
-                    self.update_weight(w.get_id(), v.get_id(), kk)
-            for w in v.get_connections():
-                marked[self.vert_num[w.get_id()]] = 0
-
-
-    #########################################################################
-    #   Given a certain k, it finds the k-truss by removing edges with      #
-    #   support no more than k. It updates the support of each edge after   #
-    #   each removal.                                                       #
+    #   Counts the number of trianges formed by every edge and stores it    #
+    #   as the weight of the edge. The counting is done on a CSR snapshot   #
+    #   by the triangles module, split across the given number of           #
+    #   processes (None for all cores); the snapshot and the flat array of  #
+    #   supports indexed by its edge ids are returned.                      #
+    #########################################################################
+    def count_triangles(self, processes=1):
+        csr = self.to_csr()
+        support = triangles.edge_support_parallel(csr, processes)
+        vertices = [self.vert_dict[node] for node in csr.ids]
+        for e in xrange(csr.num_edges):
+            v = vertices[csr.edge_src[e]]
+            w = vertices[csr.edge_dst[e]]
+            v.adjacent[w] = support[e]
+            w.adjacent[v] = support[e]
+        return csr, support
+
+
+    #########################################################################
+    #   Computes the trussness of every edge in one peel: the largest k     #
+    #   such that the edge is in the k-truss, where k is the support bound  #
+    #   used by detect_ktruss. Edges are kept in bins by support and always #
+    #   the edge with the smallest support is removed; the supports of the  #
+    #   two other edges of its triangles are moved one bin down. It returns #
+    #   the CSR snapshot and an array of trussness indexed by its edge ids. #
+    #   The initial supports are counted by the given number of processes.  #
+    #########################################################################
+    def truss_decomposition(self, processes=1):
+        if self.truss_csr is not None:
+            return self.truss_csr, self.trussness
+
+        csr = self.to_csr()
+        edge_ids = csr.build_edge_ids()
+        offsets = csr.offsets
+        adj = csr.adj
+        m = csr.num_edges
+
+        # Initial supports of the edges
+        support = triangles.edge_support_parallel(csr, processes)
+
+        # Sort the edges by support; pos[e] is the position of e in order
+        max_support = max(support) if m > 0 else 0
+        bins = array('l', [0]) * (max_support + 1)
+        for e in xrange(m):
+            bins[support[e]] += 1
+        start = 0
+        for d in xrange(max_support + 1):
+            num = bins[d]
+            bins[d] = start
+            start += num
+        pos = array('l', [0]) * m
+        order = array('l', [0]) * m
+        for e in xrange(m):
+            pos[e] = bins[support[e]]
+            order[pos[e]] = e
+            bins[support[e]] += 1
+        for d in xrange(max_support, 0, -1):
+            bins[d] = bins[d - 1]
+        bins[0] = 0
+
+        # Peel the edges in increasing order of support
+        removed = array('b', [0]) * m
+        for i in xrange(m):
+            e = order[i]
+            k = support[e]
+            # Walk the sorted neighbours of both endpoints to find the triangles
+            a = offsets[csr.edge_src[e]]
+            a_end = offsets[csr.edge_src[e] + 1]
+            b = offsets[csr.edge_dst[e]]
+            b_end = offsets[csr.edge_dst[e] + 1]
+            while a < a_end and b < b_end:
+                if adj[a] < adj[b]:
+                    a += 1
+                elif adj[a] > adj[b]:
+                    b += 1
+                else:
+                    e1 = edge_ids[a]
+                    e2 = edge_ids[b]
+                    if not removed[e1] and not removed[e2]:
+                        for f in (e1, e2):
+                            if support[f] > k:
+                                # Swap f with the first edge of its bin and shrink the bin
+                                df = support[f]
+                                pf = pos[f]
+                                pg = bins[df]
+                                g = order[pg]
+                                if f != g:
+                                    pos[f] = pg
+                                    order[pf] = g
+                                    pos[g] = pf
+                                    order[pg] = f
+                                bins[df] += 1
+                                support[f] -= 1
+                    a += 1
+                    b += 1
+            removed[e] = 1
+
+        # What is left in support is the trussness of each edge
+        self.truss_csr = csr
+        self.trussness = support
+        return csr, support
+
+
+    #########################################################################
+    #   Counts the triangles of every edge of the k-truss, using only the   #
+    #   edges with trussness at least k                                     #
+    #########################################################################
+    def truss_support(self, k):
+        csr, trussness = self.truss_decomposition()
+        edge_ids = csr.edge_ids
+        offsets = csr.offsets
+        adj = csr.adj
+        support = array('l', [0]) * csr.num_edges
+        for e in xrange(csr.num_edges):
+            if trussness[e] < k:
+                continue
+            a = offsets[csr.edge_src[e]]
+            a_end = offsets[csr.edge_src[e] + 1]
+            b = offsets[csr.edge_dst[e]]
+            b_end = offsets[csr.edge_dst[e] + 1]
+            while a < a_end and b < b_end:
+                if adj[a] < adj[b]:
+                    a += 1
+                elif adj[a] > adj[b]:
+                    b += 1
+                else:
+                    if trussness[edge_ids[a]] >= k and trussness[edge_ids[b]] >= k:
+                        support[e] += 1
+                    a += 1
+                    b += 1
+        return support
+
+
+    #########################################################################
+    #   Given a certain k, it finds the k-truss by marking edges with       #
+    #   support less than k by -1. The other edges get their support in     #
+    #   the k-truss. The trussness of the edges is used instead of peeling. #
     #########################################################################
     def detect_ktruss(self, k):
-        # Let's detect the k-truss
-
-        # First count the number of triangles
-        self.count_triangles()
-
-        # Find some edges to be removed
-        to_be_removed = []
-        for v in self:
-            for w in v.get_connections():
-                if self.get_weight(v.get_id(), w.get_id()) < k and self.vert_num[v.get_id()] < self.vert_num[w.get_id()]:
-                    to_be_removed.append((v.get_id(), w.get_id()))
-
-        # Iteratively removed edges with support no less than k
-        marked = [0] * self.num_vertices
-        to_be_decreased = []
-        while len(to_be_removed) > 0:
-            a, b = to_be_removed.pop()
-            self.update_weight(a, b, -1)
-            self.update_weight(b, a, -1)
-            # mark neighbours of vertex a
-            for w in self.vert_dict[a].get_connections():
-                if self.get_weight(a, w.get_id()) != -1:
-                    marked[self.vert_num[w.get_id()]] = 1
-            # get common neighbours of a and b
-            for w in self.vert_dict[b].get_connections():
-                if marked[self.vert_num[w.get_id()]] > 0 and self.get_weight(b, w.get_id()) != -1:
-                    to_be_decreased.append(w.get_id())
-            # decrease the support of triangles that were formed by (a,b) using common neighbours of a and b
-            for w in to_be_decreased:
-                self.update_weight(a, w, self.get_weight(a, w)-1)
-                self.update_weight(w, a, self.get_weight(w, a)-1)
-                if self.get_weight(a, w) < k and self.get_weight(a, w) > -1:
-                    to_be_removed.append((min(a, w), max(a, w)))
-                self.update_weight(w, b, self.get_weight(w, b)-1)
-                self.update_weight(b, w, self.get_weight(b, w)-1)
-                if self.get_weight(b, w) < k and self.get_weight(b, w) > -1:
-                    to_be_removed.append((min(b, w), max(b, w)))
-            # unmark all neighbours of a for consistency
-            for w in self.vert_dict[a].get_connections():
-                marked[self.vert_num[w.get_id()]] = 0
-            to_be_decreased = []
+        csr, trussness = self.truss_decomposition()
+        support = self.truss_support(k)
+        for e in xrange(csr.num_edges):
+            a = csr.ids[csr.edge_src[e]]
+            b = csr.ids[csr.edge_dst[e]]
+            if trussness[e] < k:
+                self.update_weight(a, b, -1)
+                self.update_weight(b, a, -1)
+            else:
+                self.update_weight(a, b, support[e])
+                self.update_weight(b, a, support[e])
  
 
     #########################################################################
@@ -289,54 +424,14 @@ class Graph:
     #########################################################################
     def decompose_ktruss(self, k):
         # Let's decompose the graph into k-truss
+        self.detect_ktruss(k)
 
-        # First count the number of triangles
-        self.count_triangles()
-
-        # Find some edges to be removed
-        to_be_removed = []
-        for v in self:
-            for w in v.get_connections():
-                if self.get_weight(v.get_id(), w.get_id()) < k and self.vert_num[v.get_id()] < self.vert_num[w.get_id()]:
-                    to_be_removed.append((v.get_id(), w.get_id()))
-
-        # Iteratively removed edges with support no less than k
-        marked = [0] * self.num_vertices
-        to_be_decreased = []
-        while len(to_be_removed) > 0:
-            a, b = to_be_removed.pop()
-            self.update_weight(a, b, -1)
-            self.update_weight(b, a, -1)
-            # mark neighbours of vertex a
-            for w in self.vert_dict[a].get_connections():
-                if self.get_weight(a, w.get_id()) != -1:
-                    marked[self.vert_num[w.get_id()]] = 1
-            # get common neighbours of a and b
-            for w in self.vert_dict[b].get_connections():
-                if marked[self.vert_num[w.get_id()]] > 0 and self.get_weight(b, w.get_id()) != -1:
-                    to_be_decreased.append(w.get_id())
-            # decrease the support of triangles that were formed by (a,b) using common neighbours of a and b
-            for w in to_be_decreased:
-                self.update_weight(a, w, self.get_weight(a, w)-1)
-                self.update_weight(w, a, self.get_weight(w, a)-1)
-                if self.get_weight(a, w) < k and self.get_weight(a, w) > -1:
-                    to_be_removed.append((min(a, w), max(a, w)))
-                self.update_weight(w, b, self.get_weight(w, b)-1)
-                self.update_weight(b, w, self.get_weight(b, w)-1)
-                if self.get_weight(b, w) < k and self.get_weight(b, w) > -1:
-                    to_be_removed.append((min(b, w), max(b, w)))
-            # unmark all neighbours of a for consistency
-            for w in self.vert_dict[a].get_connections():
-                marked[self.vert_num[w.get_id()]] = 0
-            to_be_decreased = []
-
-        
         # Remove redundant edges
         for v in self:
             for w in v.get_connections():
                 if self.get_weight(v.get_id(), w.get_id()) == -1:
                     self.remove_edge(v.get_id(), w.get_id())
- 
+
 
     #########################################################################
     #   It detects the connecrted components of the network                 #
@@ -392,28 +487,288 @@ class Graph:
 
     #########################################################################
     #   This is finding k-truss for different values of k until there is    #
-    #   not a connected component that contains all query vertices          #
+    #   not a connected component that contains all query vertices. It      #
+    #   uses the trussness kept in the TCP index, not its forests; those    #
+    #   answer query_tcp_communities.                                       #
     #########################################################################
     def query_ktruss(self, query):
-        k = -1
-        must_increase_k = True
-        community = []
-        while must_increase_k:
-            k += 1
-            # Let's decompose the graph into k-truss
-            self.decompose_ktruss(k)
-            rcomponents = self.detect_connected_components_inversely()
-            t = rcomponents[self.vert_num[query[0]]]
-            for q in query:
-                if rcomponents[self.vert_num[q]] != t:
-                    must_increase_k = False
-            if must_increase_k:
-                community = []
-                for v in self:
-                    if rcomponents[self.vert_num[v.get_id()]] == t:
-                        community.append(v.get_id())
-
-        return community
+        return self.build_tcp_index().query(query)
+
+
+    #########################################################################
+    #   Builds the TCP index of the graph, unless it is already built       #
+    #########################################################################
+    def build_tcp_index(self):
+        if self.tcp_index is None:
+            csr, trussness = self.truss_decomposition()
+            self.tcp_index = TCPIndex()
+            self.tcp_index.build(csr, trussness)
+        return self.tcp_index
+
+
+    #########################################################################
+    #   Saves the TCP index to a file                                       #
+    #########################################################################
+    def save_tcp_index(self, index_file):
+        self.build_tcp_index().save(index_file)
+
+
+    #########################################################################
+    #   Loads the TCP index from a file; queries can be answered from it    #
+    #   without reading the graph                                           #
+    #########################################################################
+    def load_tcp_index(self, index_file):
+        self.tcp_index = TCPIndex()
+        self.tcp_index.load(index_file)
+
+
+    #########################################################################
+    #   Finds the triangle-connected k-truss communities of a vertex        #
+    #########################################################################
+    def query_tcp_communities(self, node, k):
+        return self.build_tcp_index().query_communities(node, k)
+
+
+
+
+
+#########################################################################
+#   TCP index of Huang et al. For every vertex x, it keeps a maximum    #
+#   spanning forest of the neighbourhood of x, where neighbours y and z #
+#   are joined if xyz is a triangle, weighted by the smallest           #
+#   trussness of its three edges. The neighbours of every vertex are    #
+#   also kept sorted by the trussness of their edges, so that the       #
+#   k-truss around a vertex is visited in time linear in its size.      #
+#   Trussness is in terms of support, as in Graph.detect_ktruss.        #
+#########################################################################
+class TCPIndex:
+
+    #########################################################################
+    #   Initialize an empty index                                           #
+    #########################################################################
+    def __init__(self):
+        self.ids = []
+        self.vert_num = {}
+        # Neighbours of x are nbr[nbr_offsets[x]:nbr_offsets[x+1]], sorted by
+        # the trussness of their edges in decreasing order
+        self.nbr_offsets = array('l', [0])
+        self.nbr = array('i')
+        self.nbr_truss = array('i')
+        # Edges (tree_y[i], tree_z[i]) of weight tree_w[i] form the forest of
+        # x, for tree_offsets[x] <= i < tree_offsets[x+1]
+        self.tree_offsets = array('l', [0])
+        self.tree_y = array('i')
+        self.tree_z = array('i')
+        self.tree_w = array('i')
+
+
+    #########################################################################
+    #   Builds the index from a CSR graph and the trussness of its edges    #
+    #########################################################################
+    def build(self, csr, trussness):
+        self.ids = csr.id_list()
+        self.vert_num = dict(csr.vertex_numbers())
+        edge_ids = csr.build_edge_ids()
+        offsets = csr.offsets
+        adj = csr.adj
+        self.nbr_offsets = array('l', offsets)
+        self.nbr = array('i')
+        self.nbr_truss = array('i')
+        self.tree_offsets = array('l', [0])
+        self.tree_y = array('i')
+        self.tree_z = array('i')
+        self.tree_w = array('i')
+
+        for x in xrange(csr.num_vertices):
+            start = offsets[x]
+            end = offsets[x + 1]
+            neighbours = sorted(xrange(start, end), key=lambda i: -trussness[edge_ids[i]])
+            self.nbr.extend(adj[i] for i in neighbours)
+            self.nbr_truss.extend(trussness[edge_ids[i]] for i in neighbours)
+
+            # Triangles xyz with y < z; the merge walks N(x) after y and N(y)
+            triangles = []
+            for i in xrange(start, end):
+                y = adj[i]
+                w_xy = trussness[edge_ids[i]]
+                a = i + 1
+                b = offsets[y]
+                b_end = offsets[y + 1]
+                while a < end and b < b_end:
+                    if adj[a] < adj[b]:
+                        a += 1
+                    elif adj[a] > adj[b]:
+                        b += 1
+                    else:
+                        w = min(w_xy, trussness[edge_ids[a]], trussness[edge_ids[b]])
+                        triangles.append((w, i - start, a - start))
+                        a += 1
+                        b += 1
+
+            # Kruskal on the neighbourhood, heaviest triangles first
+            triangles.sort(reverse=True)
+            parent = range(end - start)
+            for w, ly, lz in triangles:
+                ry = find_root(parent, ly)
+                rz = find_root(parent, lz)
+                if ry != rz:
+                    parent[ry] = rz
+                    self.tree_y.append(adj[start + ly])
+                    self.tree_z.append(adj[start + lz])
+                    self.tree_w.append(w)
+            self.tree_offsets.append(len(self.tree_y))
+        return self
+
+
+    #########################################################################
+    #   Saves the index to a file                                           #
+    #########################################################################
+    def save(self, index_file):
+        arrays = {}
+        for name in ('nbr_offsets', 'nbr', 'nbr_truss', 'tree_offsets', 'tree_y', 'tree_z', 'tree_w'):
+            arr = getattr(self, name)
+            arrays[name] = (arr.typecode, arr.tostring())
+        with open(index_file, 'wb') as f:
+            cPickle.dump((self.ids, arrays), f, cPickle.HIGHEST_PROTOCOL)
+
+
+    #########################################################################
+    #   Loads the index from a file written by save                         #
+    #########################################################################
+    def load(self, index_file):
+        with open(index_file, 'rb') as f:
+            self.ids, arrays = cPickle.load(f)
+        self.vert_num = dict((node, i) for i, node in enumerate(self.ids))
+        for name in arrays:
+            typecode, data = arrays[name]
+            arr = array(typecode)
+            arr.fromstring(data)
+            setattr(self, name, arr)
+        return self
+
+
+    #########################################################################
+    #   Get the largest trussness of the edges of a dense vertex            #
+    #########################################################################
+    def max_trussness(self, x):
+        if self.nbr_offsets[x] == self.nbr_offsets[x + 1]:
+            return 0
+        return self.nbr_truss[self.nbr_offsets[x]]
+
+
+    #########################################################################
+    #   Finds the connected component of a dense vertex in the k-truss.     #
+    #   Neighbours are sorted by trussness, so each scan stops at the       #
+    #   first edge out of the k-truss.                                      #
+    #########################################################################
+    def component(self, v, k):
+        inList = set([v])
+        component = [v]
+        qq = 0
+        while qq < len(component):
+            x = component[qq]
+            for i in xrange(self.nbr_offsets[x], self.nbr_offsets[x + 1]):
+                if self.nbr_truss[i] < k:
+                    break
+                if self.nbr[i] not in inList:
+                    inList.add(self.nbr[i])
+                    component.append(self.nbr[i])
+            qq += 1
+        return component
+
+
+    #########################################################################
+    #   Adjacency of the forest of x restricted to edges of weight >= k     #
+    #########################################################################
+    def tree_adjacency(self, x, k):
+        tree_adj = {}
+        for i in xrange(self.tree_offsets[x], self.tree_offsets[x + 1]):
+            if self.tree_w[i] >= k:
+                tree_adj.setdefault(self.tree_y[i], []).append(self.tree_z[i])
+                tree_adj.setdefault(self.tree_z[i], []).append(self.tree_y[i])
+        return tree_adj
+
+
+    #########################################################################
+    #   Vertices joined to y in a forest given by tree_adjacency            #
+    #########################################################################
+    def tree_component(self, tree_adj, y):
+        reached = set([y])
+        stack = [y]
+        while len(stack) > 0:
+            z = stack.pop()
+            for u in tree_adj.get(z, []):
+                if u not in reached:
+                    reached.add(u)
+                    stack.append(u)
+        return reached
+
+
+    #########################################################################
+    #   Finds the triangle-connected k-truss communities of a vertex, for   #
+    #   k >= 1, as in the query algorithm of Huang et al. Every edge of a   #
+    #   community is queued once, and the forest of every vertex is only    #
+    #   walked once per query. It returns lists of original ids.            #
+    #########################################################################
+    def query_communities(self, node, k):
+        q = self.vert_num[node]
+        # Pairs (x, y) already queued, and pairs whose tree component in the
+        # forest of x is already expanded
+        visited = set()
+        expanded = set()
+        forests = {}
+        communities = []
+        for i in xrange(self.nbr_offsets[q], self.nbr_offsets[q + 1]):
+            if self.nbr_truss[i] < k:
+                break
+            if (q, self.nbr[i]) in visited:
+                continue
+            community = set([q])
+            visited.add((q, self.nbr[i]))
+            to_be_processed = [(q, self.nbr[i])]
+            while len(to_be_processed) > 0:
+                x, y = to_be_processed.pop()
+                if (x, y) in expanded:
+                    continue
+                if x not in forests:
+                    forests[x] = self.tree_adjacency(x, k)
+                for z in self.tree_component(forests[x], y):
+                    expanded.add((x, z))
+                    visited.add((x, z))
+                    community.add(z)
+                    if (z, x) not in visited:
+                        visited.add((z, x))
+                        to_be_processed.append((z, x))
+            communities.append([self.ids[v] for v in community])
+        return communities
+
+
+    #########################################################################
+    #   Finds the largest k for which the k-truss has all query vertices    #
+    #   in one connected component, and returns that component. k gallops   #
+    #   down from the bound given by the query vertices, and the gap is     #
+    #   closed by binary search (see ksearch), so O(log k) components are   #
+    #   visited, most of them at large k where they are small. It only      #
+    #   walks the neighbours sorted by trussness, not the forests, since a  #
+    #   connected component of the k-truss need not be triangle-connected.  #
+    #########################################################################
+    def query(self, query):
+        query = [self.vert_num[q] for q in query]
+        max_k = min(self.max_trussness(q) for q in query)
+
+        # The component of the query in the k-truss, if it has all of them
+        def feasible(k, component):
+            component = self.component(query[0], k)
+            members = set(component)
+            if all(q in members for q in query):
+                return component
+            return None
+
+        # Components get smaller as k grows, so k gallops down from max_k
+        k, component = ksearch.search_max_k(feasible, -1, max_k, None, from_top=True)
+        if component is None:
+            return []
+        return [self.ids[v] for v in component]
 
 
 
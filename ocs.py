@@ -7,11 +7,25 @@
 #########################################################################
 
 import sys
+import math
 import random
+import multiprocessing
 from os.path import isfile, join
+import csrgraph
 import copy
 
 
+# A quasi-clique search switches to bitsets when its clique and candidates
+# have at most this many vertices
+BITSET_THRESHOLD = 256
+
+# Search, first-level branches and bounds read by the worker processes; set
+# before the pool is forked, so that they are not pickled for every branch
+shared_search = None
+shared_branches = None
+shared_bound = None
+
+
 
 #########################################################################
 #   Vertex class; We consider a dictionary to store the neighbours of   #
@@ -176,6 +190,439 @@ class Vertex:
 
 
 
+#########################################################################
+#   Number of bits set in an integer                                    #
+#########################################################################
+def popcount(mask):
+    return bin(mask).count('1')
+
+
+#########################################################################
+#   Iterate over the positions of the bits set in an integer            #
+#########################################################################
+def iter_bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+#########################################################################
+#   Bit-sliced counters keep one counter per bit position: bit v of     #
+#   planes[j] is bit j of the counter of v. Adds 1 to the counters of   #
+#   the bits set in mask, with the carries rippling up the planes.      #
+#########################################################################
+def counter_add(planes, mask):
+    for j in xrange(len(planes)):
+        carry = planes[j] & mask
+        planes[j] ^= mask
+        mask = carry
+        if not mask:
+            break
+
+
+#########################################################################
+#   Subtracts 1 from the counters of the bits set in mask               #
+#########################################################################
+def counter_sub(planes, mask):
+    for j in xrange(len(planes)):
+        borrow = mask & ~planes[j]
+        planes[j] ^= mask
+        mask = borrow
+        if not mask:
+            break
+
+
+#########################################################################
+#   Get the mask of the bits of universe whose counter is at least t,   #
+#   comparing all counters with t at once from the highest plane down   #
+#########################################################################
+def counter_at_least(planes, t, universe):
+    if t <= 0:
+        return universe
+    if t >> len(planes):
+        return 0
+    above = 0
+    equal = universe
+    for j in xrange(len(planes) - 1, -1, -1):
+        if t >> j & 1:
+            equal &= planes[j]
+        else:
+            above |= equal & planes[j]
+            equal &= ~planes[j]
+    return above | equal
+
+
+
+#########################################################################
+#   Branch-and-bound search of gamma-quasi-k-cliques: sets of k         #
+#   vertices in which every vertex is adjacent to at least              #
+#   ceil(gamma*(k-1)) others. The graph is first reduced to its         #
+#   ceil(gamma*(k-1))-core, as no other vertex can be in such a clique, #
+#   and kept as a list of neighbour sets over dense ids.                #
+#########################################################################
+class QuasiCliqueSearch:
+
+    #########################################################################
+    #   Prepare the search on a graph for given gamma and k                 #
+    #########################################################################
+    def __init__(self, graph, gamma, k):
+        self.gamma = gamma
+        self.k = k
+        # Every vertex of a clique has at least this many neighbours in it
+        self.min_degree = max(0, int(math.ceil(gamma * (k - 1) - 1e-9)))
+        self.ids, self.adj = graph.kcore_adjacency(self.min_degree)
+        self.vert_num = dict((node, i) for i, node in enumerate(self.ids))
+        # If set, the search gives up as soon as this returns True
+        self.cancelled = None
+
+
+    #########################################################################
+    #   Vertices that may share a clique with v. For gamma >= 0.5 a         #
+    #   gamma-quasi-clique has diameter at most 2, so only the vertices at  #
+    #   distance 2 of v are kept; otherwise its connected component.        #
+    #########################################################################
+    def reachable(self, v):
+        adj = self.adj
+        if self.gamma >= 0.5:
+            reached = set(adj[v])
+            for u in adj[v]:
+                reached |= adj[u]
+            reached.discard(v)
+            return reached
+        reached = set([v])
+        component = [v]
+        qq = 0
+        while qq < len(component):
+            for u in adj[component[qq]]:
+                if u not in reached:
+                    reached.add(u)
+                    component.append(u)
+            qq += 1
+        reached.discard(v)
+        return reached
+
+
+    #########################################################################
+    #   Removes the candidates that cannot complete the clique C, until     #
+    #   nothing changes. A vertex can end up with the neighbours it has in  #
+    #   C plus at most the number of vertices still to be picked, among     #
+    #   its neighbours in the candidates; with gamma >= 0.5, a candidate    #
+    #   also needs a path of length at most 2 to every vertex of C. It      #
+    #   returns the remaining candidates, or None if C cannot be completed. #
+    #########################################################################
+    def prune(self, C, cand):
+        adj = self.adj
+        k = self.k
+        d = self.min_degree
+        in_C = set(C)
+        cand = set(cand)
+        changed = True
+        while changed:
+            changed = False
+            need = k - len(C)
+            if len(cand) < need:
+                return None
+            for u in C:
+                if len(adj[u] & in_C) + min(need, len(adj[u] & cand)) < d:
+                    return None
+            space = in_C | cand
+            for v in list(cand):
+                if len(adj[v] & in_C) + min(need - 1, len(adj[v] & cand)) < d:
+                    cand.discard(v)
+                    changed = True
+                elif self.gamma >= 0.5:
+                    for u in C:
+                        if u not in adj[v] and not (adj[v] & adj[u] & space):
+                            cand.discard(v)
+                            changed = True
+                            break
+        return cand
+
+
+    #########################################################################
+    #   Modified DFS used for finding quasi-cliques in the network. It      #
+    #   extends C with vertices of cand, the ones with most neighbours in   #
+    #   C first, and returns the first gamma-quasi-k-clique found, or None  #
+    #########################################################################
+    def modified_dfs(self, C, cand):
+        if self.cancelled is not None and self.cancelled():
+            return None
+        cand = self.prune(C, cand)
+        if cand is None:
+            return None
+        if len(C) == self.k:
+            return C
+        if len(C) + len(cand) <= BITSET_THRESHOLD:
+            return self.bitset_search(C, cand)
+        for next_C, next_cand in self.branches(C, cand):
+            found = self.modified_dfs(next_C, next_cand)
+            if found is not None:
+                return found
+        return None
+
+
+    #########################################################################
+    #   Yields the branches of C over pruned candidates, in search order:   #
+    #   the i-th one adds the i-th candidate and may only use the ones      #
+    #   after it                                                            #
+    #########################################################################
+    def branches(self, C, cand):
+        order = self.branch_order(C, cand)
+        for i in xrange(self.num_branches(C, order)):
+            yield C + [order[i]], order[i + 1:]
+
+
+    #########################################################################
+    #   Candidates of C in the order of its branches                        #
+    #########################################################################
+    def branch_order(self, C, cand):
+        adj = self.adj
+        in_C = set(C)
+        return sorted(cand, key=lambda v: (-len(adj[v] & in_C), -len(adj[v] & cand), v))
+
+
+    #########################################################################
+    #   Number of branches of C over candidates in branch order; it stops   #
+    #   when not enough candidates are left after order[:i]                 #
+    #########################################################################
+    def num_branches(self, C, order):
+        return max(len(order) - (self.k - len(C)) + 1, 0)
+
+
+    #########################################################################
+    #   Same search as modified_dfs on the small subgraph induced by C and  #
+    #   cand. Vertices get local ids 0..len-1 and each neighbour set is an  #
+    #   integer with a bit per local vertex. The degrees of all vertices in #
+    #   C and in C plus cand are kept in bit-sliced counters, so that the   #
+    #   degree bounds of prune are checked for all candidates at once with  #
+    #   a few integer operations. Candidates keep the order of their ids,   #
+    #   so ties are broken as in modified_dfs.                              #
+    #########################################################################
+    def bitset_search(self, C, cand):
+        local = list(C) + sorted(cand)
+        position = dict((v, i) for i, v in enumerate(local))
+        adj = []
+        for v in local:
+            mask = 0
+            for u in self.adj[v]:
+                if u in position:
+                    mask |= 1 << position[u]
+            adj.append(mask)
+        planes = len(local).bit_length()
+        deg_C = [0] * planes
+        deg_space = [0] * planes
+        for v in xrange(len(local)):
+            if v < len(C):
+                counter_add(deg_C, adj[v])
+            counter_add(deg_space, adj[v])
+        C_mask = (1 << len(C)) - 1
+        cand_mask = ((1 << len(local)) - 1) ^ C_mask
+        found = self.bitset_dfs(adj, C_mask, len(C), cand_mask, deg_C, deg_space)
+        if found is None:
+            return None
+        return [local[i] for i in iter_bits(found)]
+
+
+    #########################################################################
+    #   Same as prune, over bitsets; C and cand are masks of local vertices #
+    #   and deg_C and deg_space count the neighbours of every vertex in C   #
+    #   and in C plus cand. It returns the remaining candidates, or None,   #
+    #   and updates deg_space in place.                                     #
+    #########################################################################
+    def bitset_prune(self, adj, C, size_C, cand, deg_C, deg_space):
+        d = self.min_degree
+        need = self.k - size_C
+        # With deg_space = deg_C + deg_cand, the bound of prune
+        # deg_C + min(need, deg_cand) >= d holds iff deg_C + need >= d
+        # and deg_space >= d, and deg_C does not change here
+        if C & ~counter_at_least(deg_C, d - need, C):
+            return None
+        keep_C = counter_at_least(deg_C, d - need + 1, cand)
+        members = list(iter_bits(C))
+        while True:
+            if bin(cand).count('1') < need:
+                return None
+            if C & ~counter_at_least(deg_space, d, C):
+                return None
+            keep = keep_C & counter_at_least(deg_space, d, cand)
+            if self.gamma >= 0.5:
+                space = C | cand
+                # Only the candidates that are not adjacent to u need a
+                # common neighbour with it
+                for u in members:
+                    rest = keep & ~adj[u]
+                    while rest:
+                        low = rest & -rest
+                        rest ^= low
+                        if not adj[low.bit_length() - 1] & adj[u] & space:
+                            keep ^= low
+            removed = cand & ~keep
+            if not removed:
+                return cand
+            cand = keep
+            while removed:
+                low = removed & -removed
+                removed ^= low
+                counter_sub(deg_space, adj[low.bit_length() - 1])
+
+
+    #########################################################################
+    #   Same as modified_dfs, over bitsets; returns the mask of a clique    #
+    #########################################################################
+    def bitset_dfs(self, adj, C, size_C, cand, deg_C, deg_space):
+        if self.cancelled is not None and self.cancelled():
+            return None
+        deg_space = list(deg_space)
+        cand = self.bitset_prune(adj, C, size_C, cand, deg_C, deg_space)
+        if cand is None:
+            return None
+        if size_C == self.k:
+            return C
+        order = sorted(iter_bits(cand), key=lambda v: (-popcount(adj[v] & C), -popcount(adj[v] & cand), v))
+        need = self.k - size_C
+        rest = cand
+        for i in xrange(len(order) - need + 1):
+            v = order[i]
+            rest ^= 1 << v
+            next_deg_C = list(deg_C)
+            counter_add(next_deg_C, adj[v])
+            found = self.bitset_dfs(adj, C | (1 << v), size_C + 1, rest, next_deg_C, deg_space)
+            if found is not None:
+                return found
+            # v is left out of the later branches
+            counter_sub(deg_space, adj[v])
+        return None
+
+
+    #########################################################################
+    #   Finds a gamma-quasi-k-clique that includes vertex v0 and returns    #
+    #   its dense vertices, or None if there is none                        #
+    #########################################################################
+    def next_clique(self, v0):
+        if v0 not in self.vert_num:
+            return None
+        v = self.vert_num[v0]
+        return self.modified_dfs([v], self.reachable(v))
+
+
+    #########################################################################
+    #   Same as next_clique for every query vertex, with the search trees   #
+    #   split at the first level and the branches run on a pool of          #
+    #   processes, one at a time, so that idle workers take the next one.   #
+    #   The candidates of every query vertex are handed to the workers      #
+    #   once, before the fork, and a task only names a branch by its index. #
+    #   The first branch (in search order) that succeeds for a vertex is    #
+    #   kept in a shared array; later branches of that vertex are skipped   #
+    #   or cancelled, and the answer is the one next_clique would give. It  #
+    #   returns a dictionary from query vertices to cliques.                #
+    #########################################################################
+    def parallel_cliques(self, query, processes=None):
+        global shared_search, shared_branches, shared_bound
+        cliques = {}
+        branches = {}
+        tasks = []
+        for q in xrange(len(query)):
+            if query[q] not in self.vert_num:
+                continue
+            C = [self.vert_num[query[q]]]
+            cand = self.prune(C, self.reachable(C[0]))
+            if cand is None:
+                continue
+            if len(C) == self.k:
+                cliques[query[q]] = C
+                continue
+            branches[q] = (C, self.branch_order(C, cand))
+            for i in xrange(self.num_branches(C, branches[q][1])):
+                tasks.append((q, i))
+        if len(tasks) == 0:
+            return cliques
+
+        shared_search = self
+        shared_branches = branches
+        shared_bound = multiprocessing.Array('l', [len(tasks)] * len(query))
+        pool = multiprocessing.Pool(processes)
+        try:
+            best = {}
+            for q, i, C in pool.imap_unordered(search_branch, tasks, 1):
+                if C is not None and (q not in best or i < best[q][0]):
+                    best[q] = (i, C)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+            shared_search = None
+            shared_branches = None
+            shared_bound = None
+        for q in best:
+            cliques[query[q]] = best[q][1]
+        return cliques
+
+
+    #########################################################################
+    #   Expand the quasi clique of G[C]. Two quasi-k-cliques are adjacent   #
+    #   if they share k-1 vertices; starting from C, one vertex of a clique #
+    #   is swapped for an outside vertex whenever that gives a new clique,  #
+    #   and the vertices of all cliques reached are returned. Only cliques  #
+    #   that bring a new vertex are expanded further, so this visits at     #
+    #   most one clique per vertex of the community.                        #
+    #########################################################################
+    def expand(self, C):
+        adj = self.adj
+        d = self.min_degree
+        community = set(C)
+        # Cliques are kept sorted so that the result does not depend on the
+        # order in which the search picked the vertices of C
+        cliques = [sorted(C)]
+        while len(cliques) > 0:
+            clique = cliques.pop()
+            in_clique = set(clique)
+            degree = dict((u, len(adj[u] & in_clique)) for u in clique)
+            for u in clique:
+                rest = [x for x in clique if x != u]
+                # Degrees in the clique without u
+                rest_degree = dict((x, degree[x] - (1 if u in adj[x] else 0)) for x in rest)
+                deficient = [x for x in rest if rest_degree[x] < d]
+                if any(rest_degree[x] < d - 1 for x in deficient):
+                    continue
+                # Outside vertices with enough neighbours in rest
+                links = {}
+                for x in rest:
+                    for w in adj[x]:
+                        if w not in in_clique:
+                            links[w] = links.get(w, 0) + 1
+                for w in sorted(links):
+                    if links[w] < d or w in community:
+                        continue
+                    if all(x in adj[w] for x in deficient):
+                        community.add(w)
+                        cliques.append(sorted(rest + [w]))
+        return community
+
+
+
+
+#########################################################################
+#   Worker: searches the first-level branch i of query vertex q of the  #
+#   shared search. It gives up once an earlier branch of the same query #
+#   vertex has found a clique.                                          #
+#########################################################################
+def search_branch(task):
+    q, i = task
+    if shared_bound[q] < i:
+        return q, i, None
+    C, order = shared_branches[q]
+    shared_search.cancelled = lambda: shared_bound[q] < i
+    found = shared_search.modified_dfs(C + [order[i]], order[i + 1:])
+    if found is not None:
+        with shared_bound.get_lock():
+            if i < shared_bound[q]:
+                shared_bound[q] = i
+    return q, i, found
+
+
+
+
 #########################################################################
 #   Graph class is designed to handle operations on graph               #
 #########################################################################
@@ -194,14 +641,19 @@ class Graph:
     #########################################################################
     #   Read the list of edges of a graph from a file                       #
     #########################################################################
-    def read_graph(self, graph_file):
+    def read_graph(self, graph_file, cache=None):
         """ Add connections (list of tuple pairs) to graph """
 
-        with open(graph_file) as gf:
-            for line in gf:
-                e = [int(v) for v in line.split()]
-                self.add_edge(e[0], e[1])
-        gf.close()
+        csr = csrgraph.CSRGraph()
+        csr.read_graph(graph_file, cache)
+        self.read_csr(csr)
+
+
+    #########################################################################
+    #   Add the vertices and edges of a graph loaded in CSR form            #
+    #########################################################################
+    def read_csr(self, csr, weight = 1):
+        csr.fill_graph(self, weight)
 
 
     #########################################################################
@@ -360,58 +812,68 @@ class Graph:
 
 
     #########################################################################
-    #   Modified DFS used for finding quasi-cliques in the network          #
-    #########################################################################
-    def modified_dfs(self, gamma, k, v0, C, CC):
-        if len(C) == k:
-            # check if it is actually a gamma-quasi k-clique
-            CC.append(C)
-            return 
-
-        # Maximal number of edges that the result clique can have
-        gC = 0
-        if gC < gamma * k * (k-1) / 2:
-            return
-        for v in self.vert_dict[v0].get_connections():
-            if v.get_num_neighbors(v.get_id()) > xx:
-                modified_dfs(gamma, k, v.get_id(), C+[v], CC)
-
-
-    #########################################################################
-    #   Recursively find the quasi-cliques that include vertex v0           #
+    #   Same peel as decompose_kcore, but on a copy of the adjacency, so    #
+    #   the graph is not changed. It returns the ids of the vertices of the #
+    #   k-core and the set of neighbours of each one, over dense ids.       #
     #########################################################################
-    def next_clique(self, gamma, k, v0, C, CC):
-        C = [v0]
-        modified_dfs(gamma, k, v, C, CC)
-
+    def kcore_adjacency(self, k):
+        ids = self.vert_dict.keys()
+        index = dict((node, i) for i, node in enumerate(ids))
+        adj = [set(index[w.get_id()] for w in self.vert_dict[node].get_connections()) for node in ids]
+        alive = [True] * len(ids)
+        to_be_removed = [v for v in xrange(len(ids)) if len(adj[v]) < k]
+        for v in to_be_removed:
+            alive[v] = False
+        while len(to_be_removed) > 0:
+            u = to_be_removed.pop()
+            for w in adj[u]:
+                adj[w].discard(u)
+                if alive[w] and len(adj[w]) < k:
+                    alive[w] = False
+                    to_be_removed.append(w)
+            adj[u] = set()
 
-    #########################################################################
-    #   Expand the quasi clique of G[C]                                     #
-    #########################################################################
-    def expand(self, gamma, k, C):
-        C = []
+        # Renumber the vertices that are left
+        local = [-1] * len(ids)
+        core_ids = []
+        for v in xrange(len(ids)):
+            if alive[v]:
+                local[v] = len(core_ids)
+                core_ids.append(ids[v])
+        core_adj = [set(local[w] for w in adj[v]) for v in xrange(len(ids)) if alive[v]]
+        return core_ids, core_adj
 
 
     #########################################################################
     #   This is finding gamma-quasi k-cliques for all query vertices, and   #
-    #   outputting one such component for each vertex in query              #
+    #   outputting one such component for each vertex in query. A query     #
+    #   vertex that is already in the community of another one is skipped.  #
+    #   With more than one process, the cliques of all query vertices are   #
+    #   searched in parallel first (see parallel_cliques).                  #
     #########################################################################
-    def query_gamma_quasi_k_clique(self, gamma, k, query):
+    def query_gamma_quasi_k_clique(self, gamma, k, query, processes=1):
+        search = QuasiCliqueSearch(self, gamma, k)
         community = []
+        covered = set()
+        query = list(query)
+        cliques = None
+        if processes is None or processes > 1:
+            cliques = search.parallel_cliques(query, processes)
         while len(query) > 0:
             v0 = query.pop()
-            print v0
-            while (1):
-                C = []
-                CC = []
-                self.next_clique(gamma, k, v0, C, CC)
-                if len(C) == 0:
-                    break
-                self.expand(gamma, k, C)
-                for u in C:
-                    if u in query:
-                        query.remove(u)
-                community += C
+            if v0 in covered:
+                continue
+            if cliques is None:
+                C = search.next_clique(v0)
+            else:
+                C = cliques.get(v0)
+            if C is None:
+                continue
+            for v in sorted(search.expand(C)):
+                node = search.ids[v]
+                if node not in covered:
+                    covered.add(node)
+                    community.append(node)
 
         return community
 
@@ -421,42 +883,41 @@ class Graph:
 
 
 
-g = Graph()
-gamma = 0.9
-k = 10
+#g = Graph()
+#gamma = 0.9
+#k = 10
 # Test for large networks
 #g.read_graph("edges.txt")
-#g.query_gamma_quasi_k_clique(self, 10, 0.9, [0])
-
-g.add_vertex('a')
-g.add_vertex('b')
-g.add_vertex('c')
-g.add_vertex('d')
-g.add_vertex('e')
-g.add_vertex('f')
-
-g.add_vertex('g')
-g.add_vertex('h')
-g.add_vertex('i')
-g.add_vertex('j')
-
-g.add_edge('a', 'b')  
-g.add_edge('a', 'c')
-g.add_edge('a', 'f')
-g.add_edge('b', 'c')
-g.add_edge('b', 'd')
-g.add_edge('c', 'd')
-g.add_edge('c', 'f')
-g.add_edge('d', 'e')
-g.add_edge('e', 'f')
-g.add_edge('e', 'g')
-g.add_edge('g', 'h')
-g.add_edge('g', 'i')
-g.add_edge('g', 'j')
-g.add_edge('h', 'i')
-g.add_edge('h', 'j')
-g.add_edge('i', 'j')
+#g.query_gamma_quasi_k_clique(gamma, k, [0])
+
+#g.add_vertex('a')
+#g.add_vertex('b')
+#g.add_vertex('c')
+#g.add_vertex('d')
+#g.add_vertex('e')
+#g.add_vertex('f')
+
+#g.add_vertex('g')
+#g.add_vertex('h')
+#g.add_vertex('i')
+#g.add_vertex('j')
+
+#g.add_edge('a', 'b')
+#g.add_edge('a', 'c')
+#g.add_edge('a', 'f')
+#g.add_edge('b', 'c')
+#g.add_edge('b', 'd')
+#g.add_edge('c', 'd')
+#g.add_edge('c', 'f')
+#g.add_edge('d', 'e')
+#g.add_edge('e', 'f')
+#g.add_edge('e', 'g')
+#g.add_edge('g', 'h')
+#g.add_edge('g', 'i')
+#g.add_edge('g', 'j')
+#g.add_edge('h', 'i')
+#g.add_edge('h', 'j')
+#g.add_edge('i', 'j')
 
 # Test for detecting gamma-quasi-k-clique
-g.query_gamma_quasi_k_clique(gamma, k, ['a', 'b'])
-
+#g.query_gamma_quasi_k_clique(gamma, k, ['a', 'b'])
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+
+#########################################################################
+#   Tests of the CSR graphs of csrgraph, read from edge lists with and  #
+#   without the cache, against naive neighbour sets                     #
+#   Author: Mojtaba (Omid) Rezvani                                      #
+#########################################################################
+
+import os
+import sys
+import random
+import shutil
+import tempfile
+import unittest
+from array import array
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import csrgraph
+
+
+
+
+#########################################################################
+#   Write a random edge list with comments, blank lines, self loops,    #
+#   parallel edges and weights, and return its neighbour sets           #
+#########################################################################
+def write_edges(rng, graph_file, n, m):
+    adj = {}
+    weights = rng.random() < 0.5
+    with open(graph_file, 'w') as f:
+        for i in xrange(m):
+            u = rng.randint(0, n) * 7
+            v = rng.randint(0, n) * 7
+            if rng.random() < 0.05:
+                f.write('# %d %d\n' % (u, v))
+                continue
+            if rng.random() < 0.05:
+                f.write('\n')
+            if weights:
+                f.write('%d %d %d\n' % (u, v, rng.randint(1, 9)))
+            else:
+                f.write('%d %d\n' % (u, v))
+            adj.setdefault(u, set())
+            adj.setdefault(v, set())
+            if u != v:
+                adj[u].add(v)
+                adj[v].add(u)
+    return adj
+
+
+#########################################################################
+#   Neighbour sets of a CSR graph in terms of original ids              #
+#########################################################################
+def csr_sets(csr):
+    adj = {}
+    for v in xrange(csr.num_vertices):
+        adj[csr.get_id(v)] = set(csr.get_id(u) for u in csr.neighbors(v))
+    return adj
+
+
+
+
+class ReadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    # The line reader, the bulk loader in chunks of any size and the cache
+    # give the naive neighbour sets, with sorted neighbours
+    def test_read_graph(self):
+        rng = random.Random(1)
+        chunk_bytes = csrgraph.CHUNK_BYTES
+        try:
+            for trial in xrange(100):
+                graph_file = os.path.join(self.directory, 'graph%d.txt' % trial)
+                adj = write_edges(rng, graph_file, rng.randint(1, 20), rng.randint(0, 60))
+                csrgraph.CHUNK_BYTES = rng.choice([1, 16, 64, chunk_bytes])
+                csr = csrgraph.CSRGraph()
+                csr.read_graph_text(graph_file)
+                self.assertEqual(csr_sets(csr), adj)
+                for cache in (False, True, True):
+                    csr = csrgraph.CSRGraph()
+                    csr.read_graph(graph_file, cache)
+                    self.assertEqual(csr_sets(csr), adj)
+                    self.assertEqual(csr.num_edges, sum(len(s) for s in adj.values()) // 2)
+                    for v in xrange(csr.num_vertices):
+                        self.assertEqual(list(csr.neighbors(v)), sorted(set(csr.neighbors(v))))
+                    for node in adj:
+                        self.assertEqual(csr.get_id(csr.get_index(node)), node)
+                    self.assertEqual(csr.get_index(-1), -1)
+                if csrgraph.numpy is not None:
+                    self.assertTrue(os.path.isdir(csrgraph.cache_dir(graph_file)))
+        finally:
+            csrgraph.CHUNK_BYTES = chunk_bytes
+
+    # A cache is not used once its graph file has changed
+    def test_stale_cache(self):
+        rng = random.Random(2)
+        graph_file = os.path.join(self.directory, 'graph.txt')
+        for trial in xrange(20):
+            adj = write_edges(rng, graph_file, rng.randint(1, 20), rng.randint(0, 60))
+            os.utime(graph_file, (trial, trial))
+            csr = csrgraph.CSRGraph()
+            csr.read_graph(graph_file)
+            self.assertEqual(csr_sets(csr), adj)
+
+
+
+
+class NeighborListsTest(unittest.TestCase):
+
+    # Lists changed through mutable are copies, and the CSR arrays they
+    # were read from stay as they were
+    def test_copy_on_write(self):
+        rng = random.Random(3)
+        for trial in xrange(50):
+            csr = csrgraph.CSRGraph()
+            n = rng.randint(1, 15)
+            edges = [(u, v) for u in xrange(n) for v in xrange(u + 1, n) if rng.random() < 0.4]
+            csr.build([u for u, v in edges], [v for u, v in edges], range(n))
+            adj = array('i', csr.adj)
+            lists = csrgraph.NeighborLists(csr)
+            expected = [list(csr.neighbors(v)) for v in xrange(n)]
+            for step in xrange(20):
+                v = rng.randrange(len(lists))
+                if rng.random() < 0.3:
+                    lists.append(array('i'))
+                    expected.append([])
+                elif rng.random() < 0.5:
+                    lists.mutable(v).append(n + step)
+                    expected[v].append(n + step)
+                else:
+                    lists[v] = array('i', [step])
+                    expected[v] = [step]
+            self.assertEqual(len(lists), len(expected))
+            self.assertEqual([list(lists[v]) for v in xrange(len(lists))], expected)
+            self.assertEqual(csr.adj, adj)
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+
+#########################################################################
+#   Tests of the k-core decomposition and queries of kcore against      #
+#   naive implementations on small random graphs                        #
+#   Author: Mojtaba (Omid) Rezvani                                      #
+#########################################################################
+
+import os
+import sys
+import random
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import kcore
+
+
+
+
+#########################################################################
+#   Build a random list of edges on vertices 0..n-1                     #
+#########################################################################
+def random_edges(rng, n, p):
+    return [(u, v) for u in xrange(n) for v in xrange(u + 1, n) if rng.random() < p]
+
+
+#########################################################################
+#   Build a graph from a list of edges and isolated vertices 0..n-1     #
+#########################################################################
+def make_graph(n, edges):
+    g = kcore.Graph()
+    for v in xrange(n):
+        g.add_vertex(v)
+    for u, v in edges:
+        g.insert_edge(u, v)
+    return g
+
+
+#########################################################################
+#   Dictionary of neighbour sets of a list of edges                     #
+#########################################################################
+def neighbour_sets(n, edges):
+    adj = dict((v, set()) for v in xrange(n))
+    for u, v in edges:
+        adj[u].add(v)
+        adj[v].add(u)
+    return adj
+
+
+#########################################################################
+#   Vertices of the k-core, by removing vertices of degree less than k  #
+#   until there are none                                                #
+#########################################################################
+def naive_kcore(adj, k):
+    alive = set(adj)
+    changed = True
+    while changed:
+        changed = False
+        for v in list(alive):
+            if len(adj[v] & alive) < k:
+                alive.discard(v)
+                changed = True
+    return alive
+
+
+#########################################################################
+#   Core number of every vertex: the largest k whose k-core has it      #
+#########################################################################
+def naive_cores(adj):
+    cores = dict((v, 0) for v in adj)
+    k = 1
+    while True:
+        core = naive_kcore(adj, k)
+        if len(core) == 0:
+            return cores
+        for v in core:
+            cores[v] = k
+        k += 1
+
+
+#########################################################################
+#   Connected component of v among a set of vertices                    #
+#########################################################################
+def component_of(adj, vertices, v):
+    component = set([v])
+    stack = [v]
+    while len(stack) > 0:
+        x = stack.pop()
+        for y in adj[x] & vertices:
+            if y not in component:
+                component.add(y)
+                stack.append(y)
+    return component
+
+
+#########################################################################
+#   Largest k >= 1 for which the query is in one component of the       #
+#   k-core, and that component; (0, set()) if there is none             #
+#########################################################################
+def naive_query(adj, query):
+    k = max(naive_cores(adj).values() + [0])
+    while k >= 1:
+        core = naive_kcore(adj, k)
+        if all(q in core for q in query):
+            component = component_of(adj, core, query[0])
+            if all(q in component for q in query):
+                return k, component
+        k -= 1
+    return 0, set()
+
+
+
+
+class CoreTest(unittest.TestCase):
+
+    # Core numbers of the bin sort against repeated peeling
+    def test_core_numbers(self):
+        rng = random.Random(1)
+        for trial in xrange(200):
+            n = rng.randint(1, 20)
+            edges = random_edges(rng, n, rng.choice([0.1, 0.3, 0.6]))
+            g = make_graph(n, edges)
+            cores = naive_cores(neighbour_sets(n, edges))
+            computed = g.core_numbers()
+            self.assertEqual(dict((v, computed[g.get_index(v)]) for v in xrange(n)), cores)
+
+
+
+
+class IndexTest(unittest.TestCase):
+
+    # The core-component forest answers as the naive search over k
+    def test_query_kcores(self):
+        rng = random.Random(2)
+        for trial in xrange(200):
+            n = rng.randint(1, 20)
+            edges = random_edges(rng, n, rng.choice([0.1, 0.3, 0.6]))
+            g = make_graph(n, edges)
+            adj = neighbour_sets(n, edges)
+            for i in xrange(3):
+                query = rng.sample(xrange(n), rng.randint(1, min(n, 3)))
+                k, component = naive_query(adj, query)
+                self.assertEqual(sorted(g.query_kcores(query)), sorted(component))
+                index = g.build_core_index()
+                node = index.lowest_common_ancestor([g.get_index(q) for q in query])
+                self.assertEqual(index.node_k[node] if node != -1 else 0, k)
+
+
+
+
+class LocalTest(unittest.TestCase):
+
+    # The local search finds a connected community of the query with the
+    # largest minimum degree, which is the k of the naive search
+    def test_query_kcores_local(self):
+        rng = random.Random(3)
+        for trial in xrange(200):
+            n = rng.randint(1, 20)
+            edges = random_edges(rng, n, rng.choice([0.1, 0.3, 0.6]))
+            g = make_graph(n, edges)
+            if trial % 2:
+                g.core_numbers()
+            adj = neighbour_sets(n, edges)
+            for i in xrange(3):
+                query = rng.sample(xrange(n), rng.randint(1, min(n, 3)))
+                k, component = naive_query(adj, query)
+                community = set(g.query_kcores_local(query))
+                if k == 0:
+                    self.assertEqual(community, set())
+                    continue
+                self.assertTrue(all(q in community for q in query))
+                self.assertEqual(component_of(adj, community, query[0]), community)
+                self.assertEqual(min(len(adj[v] & community) for v in community), k)
+
+
+
+
+class MaintenanceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    # Core numbers kept under insertions and deletions, on graphs read
+    # from a file with and without the CSR cache, against peeling again
+    def test_insert_and_delete(self):
+        rng = random.Random(4)
+        for trial in xrange(60):
+            n = rng.randint(2, 15)
+            edges = set(random_edges(rng, n, rng.choice([0.2, 0.4])))
+            graph_file = os.path.join(self.directory, 'graph%d.txt' % trial)
+            with open(graph_file, 'w') as f:
+                for u, v in edges:
+                    f.write('%d %d\n' % (u, v))
+            for cache in (False, True, True):
+                g = kcore.Graph()
+                g.read_graph(graph_file, cache)
+                g.core_numbers()
+                current = set(edges)
+                vertices = set(v for e in edges for v in e)
+                for step in xrange(30):
+                    u, v = rng.sample(xrange(n + 2), 2)
+                    if rng.random() < 0.5:
+                        g.insert_edge(u, v)
+                        current.add((min(u, v), max(u, v)))
+                        vertices.update((u, v))
+                    else:
+                        g.delete_edge(u, v)
+                        current.discard((min(u, v), max(u, v)))
+                    adj = dict((x, set()) for x in vertices)
+                    for x, y in current:
+                        adj[x].add(y)
+                        adj[y].add(x)
+                    cores = g.core_numbers()
+                    self.assertEqual(dict((x, cores[g.get_index(x)]) for x in vertices), naive_cores(adj))
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+
+#########################################################################
+#   Regression tests for the kECC decompositions of kecc                #
+#   Author: Mojtaba (Omid) Rezvani                                      #
+#########################################################################
+
+import os
+import sys
+import random
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import kecc
+
+
+# The only 3-edge-connected component is the K4 {4, 6, 7, 8}; the other
+# vertices have degree 3 and may be contracted into it
+VERIFY_EDGES = [(0, 1), (0, 5), (1, 2), (1, 3), (2, 4), (3, 6), (3, 8), (4, 5),
+                (4, 6), (4, 7), (4, 8), (5, 7), (6, 7), (6, 8), (7, 8)]
+
+
+
+
+#########################################################################
+#   Build a graph from a list of edges                                  #
+#########################################################################
+def make_graph(edges):
+    g = kecc.Graph()
+    for u, v in edges:
+        g.add_edge(u, v)
+    return g
+
+
+
+
+class VerifyTest(unittest.TestCase):
+
+    def test_decompose_with_verify(self):
+        g = make_graph(VERIFY_EDGES)
+        communities = g.decompose_kecc(3, verify=True)
+        self.assertEqual([sorted(c) for c in communities], [[4, 6, 7, 8]])
+
+    def test_trials_with_verify(self):
+        g = make_graph(VERIFY_EDGES)
+        communities, confidence = g.decompose_kecc_trials(3, 4, processes=1, verify=True)
+        self.assertEqual([sorted(c) for c in communities], [[4, 6, 7, 8]])
+
+    def test_exact(self):
+        g = make_graph(VERIFY_EDGES)
+        communities = g.decompose_kecc(3, exact=True)
+        self.assertEqual([sorted(c) for c in communities], [[4, 6, 7, 8]])
+
+
+
+
+#########################################################################
+#   Build a random graph on vertices 0..n-1                             #
+#########################################################################
+def random_graph(rng, n, p):
+    g = kecc.Graph()
+    for v in xrange(n):
+        g.add_vertex(v)
+    for u in xrange(n):
+        for v in xrange(u + 1, n):
+            if rng.random() < p:
+                g.add_edge(u, v)
+    return g
+
+
+#########################################################################
+#   Build a random graph of dense parts of size vertices each, with a   #
+#   few edges between the parts                                         #
+#########################################################################
+def planted_graph(rng, size, parts):
+    g = kecc.Graph()
+    n = size * parts
+    for v in xrange(n):
+        g.add_vertex(v)
+    for u in xrange(n):
+        for v in xrange(u + 1, n):
+            if rng.random() < (0.9 if u // size == v // size else 0.08):
+                g.add_edge(u, v)
+    return g
+
+
+#########################################################################
+#   Weight of the edges of a snapshot across a set of vertices          #
+#########################################################################
+def cut_weight(snapshot, side):
+    side = set(side)
+    return sum(snapshot.weight[e] for e in xrange(len(snapshot.src)) if (snapshot.src[e] in side) != (snapshot.dst[e] in side))
+
+
+
+
+class CutTest(unittest.TestCase):
+
+    # The minimum cut against all the cuts of small random graphs
+    def test_min_cut(self):
+        rng = random.Random(1)
+        for trial in xrange(200):
+            n = rng.randint(2, 9)
+            snapshot = random_graph(rng, n, rng.choice([0.4, 0.7, 0.9])).edge_snapshot()
+            best = min(cut_weight(snapshot, [v for v in xrange(n) if (mask >> v) & 1]) for mask in xrange(1, 2 ** (n - 1)))
+            weight, side = snapshot.min_cut()
+            self.assertEqual(weight, best)
+            self.assertEqual(cut_weight(snapshot, side), best)
+            for k in xrange(1, n + 1):
+                side = snapshot.small_cut(k)
+                if best >= k:
+                    self.assertEqual(side, None)
+                else:
+                    self.assertTrue(cut_weight(snapshot, side) < k)
+
+
+
+
+class TrialsTest(unittest.TestCase):
+
+    # Single trials often join the dense parts of a planted graph, but
+    # every trial and their combination keep each exact kECC in one
+    # community, and with verify the combination is exact
+    def test_trials_keep_kecc(self):
+        rng = random.Random(3)
+        for trial in xrange(100):
+            size = rng.randint(4, 7)
+            g = planted_graph(rng, size, rng.randint(2, 4))
+            k = rng.randint(2, size - 1)
+            exact = g.decompose_kecc(k, exact=True)
+            snapshot = g.edge_snapshot()
+            results = kecc.run_trials(snapshot, k, 5, processes=1, seed=trial)
+            combined, confidence = kecc.combine_trials(len(snapshot.ids), results)
+            for communities in results + [combined]:
+                label = {}
+                for c in xrange(len(communities)):
+                    for v in communities[c]:
+                        label[snapshot.ids[v]] = c
+                for community in exact:
+                    self.assertEqual(len(set(label.get(v) for v in community)), 1)
+                    self.assertTrue(community[0] in label)
+            communities, confidence = g.decompose_kecc_trials(k, 5, processes=1, seed=trial, verify=True)
+            self.assertEqual(sorted(sorted(c) for c in communities), sorted(sorted(c) for c in exact))
+
+
+
+
+class IndexTest(unittest.TestCase):
+
+    # Two K5 joined by the bridge 0-5: only k=1 holds 0 and 5 together
+    def test_query_over_bridge(self):
+        edges = [(u, v) for u in xrange(5) for v in xrange(u + 1, 5)]
+        edges += [(u + 5, v + 5) for u, v in edges]
+        edges.append((0, 5))
+        g = make_graph(edges)
+        k, community = g.build_kecc_index().query([0, 5])
+        self.assertEqual(k, 1)
+        self.assertEqual(sorted(community), range(10))
+        k, community = g.build_kecc_index().query([0, 1])
+        self.assertEqual(k, 4)
+        self.assertEqual(sorted(community), range(5))
+
+    # The index answers as the exact decompositions, and query_kecc only
+    # uses it once it is built
+    def test_index_against_decomposition(self):
+        rng = random.Random(2)
+        for trial in xrange(50):
+            n = rng.randint(4, 14)
+            g = random_graph(rng, n, 0.4)
+            for i in xrange(5):
+                query = rng.sample(xrange(n), rng.randint(1, 3))
+                expected = sorted(g.query_kecc(query, exact=True))
+                self.assertEqual(g.kecc_index, None)
+                g.build_kecc_index()
+                self.assertEqual(sorted(g.query_kecc(query)), expected)
+                g.kecc_index = None
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+
+#########################################################################
+#   Tests of the search over k of ksearch on monotone predicates        #
+#   Author: Mojtaba (Omid) Rezvani                                      #
+#########################################################################
+
+import os
+import sys
+import random
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import ksearch
+
+
+
+
+class SearchTest(unittest.TestCase):
+
+    # For a threshold t, k is feasible iff k <= t, and its state is the
+    # list of feasible k tried so far. The search must find the largest
+    # feasible k, pass on the state of a smaller feasible k only, and
+    # take O(log k) tests.
+    def test_search_max_k(self):
+        rng = random.Random(1)
+        for trial in xrange(2000):
+            low = rng.randint(-1, 5)
+            high = rng.choice([None, low + rng.randint(0, 200)])
+            t = low + rng.randint(0, 200 if high is None else high - low)
+            from_top = high is not None and rng.random() < 0.5
+            tested = []
+
+            def feasible(k, state):
+                tested.append(k)
+                self.assertTrue(low < k and (high is None or k <= high))
+                self.assertTrue(len(state) == 0 or state[-1] < k)
+                if k > t:
+                    return None
+                return state + [k]
+
+            k, state = ksearch.search_max_k(feasible, low, high, [], from_top)
+            self.assertEqual(k, t)
+            self.assertEqual(state[-1] if len(state) > 0 else low, t)
+            self.assertTrue(len(tested) <= 2 * (201).bit_length() + 2)
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+
+#########################################################################
+#   Tests of the truss decomposition and the TCP index of ktruss        #
+#   against naive implementations on small random graphs                #
+#   Author: Mojtaba (Omid) Rezvani                                      #
+#########################################################################
+
+import os
+import sys
+import random
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import ktruss
+
+
+
+
+#########################################################################
+#   Build a random list of edges on vertices 0..n-1                     #
+#########################################################################
+def random_edges(rng, n, p):
+    return [(u, v) for u in xrange(n) for v in xrange(u + 1, n) if rng.random() < p]
+
+
+#########################################################################
+#   Build a graph from a list of edges and isolated vertices 0..n-1     #
+#########################################################################
+def make_graph(n, edges):
+    g = ktruss.Graph()
+    for v in xrange(n):
+        g.add_vertex(v)
+    for u, v in edges:
+        g.add_edge(u, v)
+    return g
+
+
+#########################################################################
+#   Dictionary of neighbour sets of a list of edges                     #
+#########################################################################
+def neighbour_sets(n, edges):
+    adj = dict((v, set()) for v in xrange(n))
+    for u, v in edges:
+        adj[u].add(v)
+        adj[v].add(u)
+    return adj
+
+
+#########################################################################
+#   Edges of the k-truss, in terms of support: edges in fewer than k    #
+#   triangles are removed until there are none                          #
+#########################################################################
+def naive_ktruss(edges, k):
+    alive = set(edges)
+    changed = True
+    while changed:
+        changed = False
+        adj = {}
+        for u, v in alive:
+            adj.setdefault(u, set()).add(v)
+            adj.setdefault(v, set()).add(u)
+        for u, v in list(alive):
+            if len(adj[u] & adj[v]) < k:
+                alive.discard((u, v))
+                changed = True
+    return alive
+
+
+#########################################################################
+#   Trussness of every edge: the largest k whose k-truss has it         #
+#########################################################################
+def naive_trussness(edges):
+    trussness = dict((e, 0) for e in edges)
+    k = 1
+    while True:
+        truss = naive_ktruss(edges, k)
+        if len(truss) == 0:
+            return trussness
+        for e in truss:
+            trussness[e] = k
+        k += 1
+
+
+
+
+#########################################################################
+#   Largest k for which the query is in one connected component of the  #
+#   k-truss, the edges of trussness at least k (with all vertices for   #
+#   k = 0), and that component; [] if there is none                     #
+#########################################################################
+def naive_query(n, trussness, query):
+    k = max(trussness.values() + [0])
+    while k >= 0:
+        adj = neighbour_sets(n, [e for e in trussness if trussness[e] >= k])
+        if k > 0 and any(len(adj[q]) == 0 for q in query):
+            k -= 1
+            continue
+        component = set([query[0]])
+        stack = [query[0]]
+        while len(stack) > 0:
+            x = stack.pop()
+            for y in adj[x] - component:
+                component.add(y)
+                stack.append(y)
+        if all(q in component for q in query):
+            return sorted(component)
+        k -= 1
+    return []
+
+
+#########################################################################
+#   Triangle-connected k-truss communities of a vertex: edges of        #
+#   trussness at least k are joined when they share a triangle of such  #
+#   edges, and the vertices of every class of edges at q are returned   #
+#########################################################################
+def naive_communities(n, trussness, q, k):
+    edges = [e for e in trussness if trussness[e] >= k]
+    adj = neighbour_sets(n, edges)
+    parent = dict((e, e) for e in edges)
+
+    def find(e):
+        while parent[e] != e:
+            e = parent[e]
+        return e
+
+    for u, v in edges:
+        for w in adj[u] & adj[v]:
+            for f in ((min(u, w), max(u, w)), (min(v, w), max(v, w))):
+                parent[find(f)] = find((u, v))
+    classes = {}
+    for e in edges:
+        classes.setdefault(find(e), set()).update(e)
+    return sorted(sorted(c) for c in classes.values() if q in c)
+
+
+
+
+class TrussTest(unittest.TestCase):
+
+    # Trussness of the bucketed peel against repeated peeling, and the
+    # weights set by detect_ktruss against the supports in the k-truss
+    def test_truss_decomposition(self):
+        rng = random.Random(1)
+        for trial in xrange(150):
+            n = rng.randint(1, 14)
+            edges = random_edges(rng, n, rng.choice([0.2, 0.5, 0.8]))
+            g = make_graph(n, edges)
+            csr, trussness = g.truss_decomposition()
+            computed = {}
+            for e in xrange(csr.num_edges):
+                u = csr.ids[csr.edge_src[e]]
+                v = csr.ids[csr.edge_dst[e]]
+                computed[(min(u, v), max(u, v))] = trussness[e]
+            self.assertEqual(computed, naive_trussness(edges))
+
+            k = rng.randint(0, 4)
+            truss = naive_ktruss(edges, k)
+            adj = neighbour_sets(n, truss)
+            g.detect_ktruss(k)
+            for u, v in edges:
+                if (u, v) in truss:
+                    self.assertEqual(g.get_weight(u, v), len(adj[u] & adj[v]))
+                else:
+                    self.assertEqual(g.get_weight(u, v), -1)
+
+
+
+
+class TCPTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    # Queries of the TCP index, built or loaded from a file, against the
+    # naive searches over the trussness of the edges
+    def test_queries(self):
+        rng = random.Random(2)
+        index_file = os.path.join(self.directory, 'tcp')
+        for trial in xrange(150):
+            n = rng.randint(1, 14)
+            edges = random_edges(rng, n, rng.choice([0.2, 0.5, 0.8]))
+            g = make_graph(n, edges)
+            trussness = naive_trussness(edges)
+            if trial % 2:
+                g.save_tcp_index(index_file)
+                g = ktruss.Graph()
+                g.load_tcp_index(index_file)
+            for i in xrange(3):
+                query = rng.sample(xrange(n), rng.randint(1, min(n, 3)))
+                self.assertEqual(sorted(g.query_ktruss(query)), naive_query(n, trussness, query))
+                q = query[0]
+                k = rng.randint(1, 4)
+                communities = sorted(sorted(c) for c in g.query_tcp_communities(q, k))
+                self.assertEqual(communities, naive_communities(n, trussness, q, k))
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
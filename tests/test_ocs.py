@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+
+#########################################################################
+#   Tests of the gamma-quasi-k-clique search of ocs against a brute     #
+#   force search on small random graphs                                 #
+#   Author: Mojtaba (Omid) Rezvani                                      #
+#########################################################################
+
+import os
+import sys
+import math
+import random
+import unittest
+from itertools import combinations
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import ocs
+
+
+
+
+#########################################################################
+#   Build a random graph on vertices 0..n-1 and its neighbour sets      #
+#########################################################################
+def random_graph(rng, n, p):
+    g = ocs.Graph()
+    adj = dict((v, set()) for v in xrange(n))
+    for v in xrange(n):
+        g.add_vertex(v)
+    for u in xrange(n):
+        for v in xrange(u + 1, n):
+            if rng.random() < p:
+                g.add_edge(u, v)
+                adj[u].add(v)
+                adj[v].add(u)
+    return g, adj
+
+
+#########################################################################
+#   Tell whether a set of k vertices is a gamma-quasi-k-clique          #
+#########################################################################
+def is_quasi_clique(adj, vertices, gamma, k):
+    d = int(math.ceil(gamma * (k - 1) - 1e-9))
+    vertices = set(vertices)
+    return len(vertices) == k and all(len(adj[v] & vertices) >= d for v in vertices)
+
+
+#########################################################################
+#   Tell whether some gamma-quasi-k-clique has v, trying all sets       #
+#########################################################################
+def has_quasi_clique(adj, v, gamma, k):
+    others = [u for u in adj if u != v]
+    return any(is_quasi_clique(adj, (v,) + rest, gamma, k) for rest in combinations(others, k - 1))
+
+
+
+
+class CliqueTest(unittest.TestCase):
+
+    # A clique is found for a vertex iff one exists, and it is valid
+    def test_next_clique(self):
+        rng = random.Random(1)
+        for trial in xrange(150):
+            n = rng.randint(2, 10)
+            g, adj = random_graph(rng, n, rng.choice([0.3, 0.5, 0.8]))
+            gamma = rng.choice([0.3, 0.5, 0.6, 0.8, 1.0])
+            k = rng.randint(2, min(n, 5))
+            search = ocs.QuasiCliqueSearch(g, gamma, k)
+            for v in xrange(n):
+                C = search.next_clique(v)
+                if C is None:
+                    self.assertFalse(has_quasi_clique(adj, v, gamma, k))
+                else:
+                    C = [search.ids[u] for u in C]
+                    self.assertTrue(v in C)
+                    self.assertTrue(is_quasi_clique(adj, C, gamma, k))
+
+    # The community of a query has every query vertex that is in a clique,
+    # and only vertices that are in one
+    def test_query(self):
+        rng = random.Random(2)
+        for trial in xrange(100):
+            n = rng.randint(2, 10)
+            g, adj = random_graph(rng, n, rng.choice([0.3, 0.5, 0.8]))
+            gamma = rng.choice([0.3, 0.5, 0.6, 0.8, 1.0])
+            k = rng.randint(2, min(n, 5))
+            query = rng.sample(xrange(n), rng.randint(1, min(n, 3)))
+            community = g.query_gamma_quasi_k_clique(gamma, k, query)
+            self.assertEqual(len(community), len(set(community)))
+            for v in query:
+                self.assertEqual(v in community, has_quasi_clique(adj, v, gamma, k))
+            for v in community:
+                self.assertTrue(has_quasi_clique(adj, v, gamma, k))
+
+
+
+
+class ParallelTest(unittest.TestCase):
+
+    # The branches run on a pool give the vertices of the clique that
+    # next_clique gives, and so the same community
+    def test_parallel_cliques(self):
+        rng = random.Random(3)
+        for trial in xrange(15):
+            n = rng.randint(6, 14)
+            g, adj = random_graph(rng, n, rng.choice([0.4, 0.6]))
+            gamma = rng.choice([0.5, 0.6, 0.8])
+            k = rng.randint(3, 6)
+            query = rng.sample(xrange(n), 3)
+            search = ocs.QuasiCliqueSearch(g, gamma, k)
+            cliques = search.parallel_cliques(query, 2)
+            for v in query:
+                C = search.next_clique(v)
+                self.assertEqual(v in cliques, C is not None)
+                if C is not None:
+                    self.assertEqual(sorted(cliques[v]), sorted(C))
+            self.assertEqual(g.query_gamma_quasi_k_clique(gamma, k, query, processes=2), g.query_gamma_quasi_k_clique(gamma, k, query))
+
+
+
+
+class BitsetTest(unittest.TestCase):
+
+    # The bitset search on small subgraphs finds the vertices of the
+    # clique the search over sets finds
+    def test_bitset_search(self):
+        rng = random.Random(4)
+        threshold = ocs.BITSET_THRESHOLD
+        try:
+            for trial in xrange(150):
+                n = rng.randint(2, 14)
+                g, adj = random_graph(rng, n, rng.choice([0.3, 0.5, 0.8]))
+                gamma = rng.choice([0.3, 0.5, 0.6, 0.8, 1.0])
+                k = rng.randint(2, min(n, 6))
+                search = ocs.QuasiCliqueSearch(g, gamma, k)
+                for v in xrange(n):
+                    ocs.BITSET_THRESHOLD = 0
+                    C = search.next_clique(v)
+                    ocs.BITSET_THRESHOLD = threshold
+                    found = search.next_clique(v)
+                    self.assertEqual(found is None, C is None)
+                    if C is not None:
+                        self.assertEqual(sorted(found), sorted(C))
+        finally:
+            ocs.BITSET_THRESHOLD = threshold
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+#########################################################################
+#   Tests of the triangle counting of triangles against naive counts    #
+#   on small random graphs                                              #
+#   Author: Mojtaba (Omid) Rezvani                                      #
+#########################################################################
+
+import os
+import sys
+import random
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import csrgraph
+import triangles
+
+
+
+
+#########################################################################
+#   Build a random CSR graph on vertices 0..n-1, with a few vertices    #
+#   joined to most others, so that neighbour lists differ in length     #
+#########################################################################
+def random_csr(rng, n, p):
+    hubs = set(rng.sample(xrange(n), min(n, 2)))
+    src = []
+    dst = []
+    for u in xrange(n):
+        for v in xrange(u + 1, n):
+            if rng.random() < (0.9 if u in hubs or v in hubs else p):
+                src.append(u)
+                dst.append(v)
+    csr = csrgraph.CSRGraph()
+    csr.build(src, dst, range(n))
+    csr.build_edge_ids()
+    return csr
+
+
+#########################################################################
+#   Number of triangles of every edge id, from the common neighbours of #
+#   its endpoints                                                       #
+#########################################################################
+def naive_support(csr):
+    adj = [set(csr.neighbors(v)) for v in xrange(csr.num_vertices)]
+    return [len(adj[csr.edge_src[e]] & adj[csr.edge_dst[e]]) for e in xrange(csr.num_edges)]
+
+
+
+
+class CountTest(unittest.TestCase):
+
+    # Supports of the oriented and vectorised counts against the naive count
+    def test_edge_support(self):
+        rng = random.Random(1)
+        for trial in xrange(150):
+            csr = random_csr(rng, rng.randint(1, 30), rng.choice([0.1, 0.3, 0.6]))
+            expected = naive_support(csr)
+            self.assertEqual(list(triangles.edge_support(csr)), expected)
+            if triangles.numpy is not None:
+                self.assertEqual(list(triangles.edge_support_numpy(csr)), expected)
+
+    # Merging and galloping find the same common entries
+    def test_intersections(self):
+        rng = random.Random(2)
+        for trial in xrange(300):
+            a = sorted(rng.sample(xrange(100), rng.randint(0, 40)))
+            b = sorted(rng.sample(xrange(100), rng.randint(0, 5)))
+            adj = a + b
+            expected = [(a.index(x), len(a) + b.index(x)) for x in sorted(set(a) & set(b))]
+            self.assertEqual(list(triangles.merge_intersection(adj, 0, len(a), len(a), len(adj))), expected)
+            self.assertEqual(list(triangles.galloping_intersection(adj, 0, len(a), len(a), len(adj))), expected)
+
+
+
+
+class ParallelTest(unittest.TestCase):
+
+    # Supports counted by a pool of processes against the naive count, with
+    # the counts of the workers added up with and without NumPy
+    def test_edge_support_parallel(self):
+        rng = random.Random(3)
+        numpy = triangles.numpy
+        try:
+            for trial in xrange(20):
+                csr = random_csr(rng, rng.randint(1, 40), rng.choice([0.1, 0.3, 0.6]))
+                if trial % 2:
+                    triangles.numpy = None
+                else:
+                    triangles.numpy = numpy
+                support = triangles.edge_support_parallel(csr, rng.randint(2, 3))
+                self.assertEqual(list(support), naive_support(csr))
+        finally:
+            triangles.numpy = numpy
+
+    # The chunks of work cover the vertices in order, without gaps
+    def test_split_work(self):
+        rng = random.Random(4)
+        for trial in xrange(100):
+            oriented = triangles.OrientedGraph(random_csr(rng, rng.randint(1, 40), 0.3))
+            chunks = triangles.split_work(oriented, rng.randint(1, 12))
+            self.assertEqual(chunks[0][0], 0)
+            self.assertEqual(chunks[-1][1], oriented.num_vertices)
+            for i in xrange(1, len(chunks)):
+                self.assertEqual(chunks[i][0], chunks[i - 1][1])
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,336 @@
+#!/usr/bin/env python
+
+#########################################################################
+#   This code counts the triangles of every edge of a graph given in    #
+#   CSR form (see csrgraph). Edges are oriented from the endpoint of    #
+#   lower degree to the one of higher degree (compact-forward), so      #
+#   every triangle is found exactly once, and the sorted neighbour      #
+#   lists are intersected by merging or by galloping. The support of    #
+#   the edges is returned as a flat array indexed by edge id. Large     #
+#   graphs can be split by ranges of vertices across processes that     #
+#   share the oriented graph in memory.                                 #
+#   Author: Mojtaba (Omid) Rezvani                                      #
+#########################################################################
+
+import sys
+import bisect
+import ctypes
+import multiprocessing
+from multiprocessing import sharedctypes
+from array import array
+from collections import defaultdict
+
+# NumPy is only needed for the vectorised batch path
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Gallop when one list is this many times longer than the other
+GALLOP_RATIO = 8
+
+# Number of gathered neighbours per batch in the vectorised path
+BATCH_SIZE = 1 << 22
+
+# Number of chunks of work per process in the parallel path
+CHUNKS_PER_PROCESS = 4
+
+# Oriented graph in shared memory, set before the worker processes are
+# forked so that they read it without a pickled copy
+shared_graph = None
+
+
+
+
+#########################################################################
+#   Degree-ordered orientation of a CSR graph. Vertices are relabelled  #
+#   by rank (degree, then id), and out(u) holds the neighbours of u of  #
+#   higher rank, sorted by rank; eid gives the edge id of each entry.   #
+#########################################################################
+class OrientedGraph:
+
+    #########################################################################
+    #   Orient the edges of a CSR graph                                     #
+    #########################################################################
+    def __init__(self, csr):
+        n = csr.num_vertices
+        edge_ids = csr.build_edge_ids()
+        offsets = csr.offsets
+        adj = csr.adj
+
+        # rank[v] is the position of v when sorted by (degree, id)
+        order = sorted(xrange(n), key=lambda v: (offsets[v + 1] - offsets[v], v))
+        rank = array('i', [0]) * n
+        for r in xrange(n):
+            rank[order[r]] = r
+
+        # Out-degrees and offsets in rank space
+        self.num_vertices = n
+        self.offsets = array('l', [0]) * (n + 1)
+        for v in xrange(n):
+            rv = rank[v]
+            for i in xrange(offsets[v], offsets[v + 1]):
+                if rank[adj[i]] > rv:
+                    self.offsets[rv + 1] += 1
+        for r in xrange(n):
+            self.offsets[r + 1] += self.offsets[r]
+
+        self.adj = array('i', [0]) * self.offsets[n]
+        self.eid = array('l', [0]) * self.offsets[n]
+        for r in xrange(n):
+            v = order[r]
+            rv = rank[v]
+            out = sorted((rank[adj[i]], edge_ids[i]) for i in xrange(offsets[v], offsets[v + 1]) if rank[adj[i]] > rv)
+            pos = self.offsets[r]
+            for w, e in out:
+                self.adj[pos] = w
+                self.eid[pos] = e
+                pos += 1
+
+
+#########################################################################
+#   Finds the common entries of the sorted ranges adj[a:a_end] and      #
+#   adj[b:b_end] by merging, and yields their positions in both         #
+#########################################################################
+def merge_intersection(adj, a, a_end, b, b_end):
+    while a < a_end and b < b_end:
+        if adj[a] < adj[b]:
+            a += 1
+        elif adj[a] > adj[b]:
+            b += 1
+        else:
+            yield a, b
+            a += 1
+            b += 1
+
+
+#########################################################################
+#   Same as merge_intersection, but every entry of the short range is   #
+#   searched for in the long range by doubling steps and bisection      #
+#########################################################################
+def galloping_intersection(adj, a, a_end, b, b_end):
+    swapped = a_end - a > b_end - b
+    if swapped:
+        a, a_end, b, b_end = b, b_end, a, a_end
+    while a < a_end and b < b_end:
+        x = adj[a]
+        step = 1
+        hi = b
+        while hi < b_end and adj[hi] < x:
+            b = hi + 1
+            hi = b + step
+            step *= 2
+        b = bisect.bisect_left(adj, x, b, min(hi + 1, b_end))
+        if b < b_end and adj[b] == x:
+            if swapped:
+                yield b, a
+            else:
+                yield a, b
+            b += 1
+        a += 1
+
+
+#########################################################################
+#   Picks merging or galloping based on the lengths of the ranges       #
+#########################################################################
+def intersection(adj, a, a_end, b, b_end):
+    la = a_end - a
+    lb = b_end - b
+    if la * GALLOP_RATIO < lb or lb * GALLOP_RATIO < la:
+        return galloping_intersection(adj, a, a_end, b, b_end)
+    return merge_intersection(adj, a, a_end, b, b_end)
+
+
+#########################################################################
+#   Counts the triangles of every edge of a CSR graph. For each edge    #
+#   u->v of the oriented graph, the common out-neighbours w of u and v  #
+#   close the triangle uvw, which is seen only from its lowest vertex.  #
+#########################################################################
+def edge_support(csr, oriented=None):
+    if oriented is None:
+        oriented = OrientedGraph(csr)
+    support = array('l', [0]) * csr.num_edges
+    count_range(oriented, 0, oriented.num_vertices, support)
+    return support
+
+
+#########################################################################
+#   Adds the triangles found from the vertices first..last-1 (in rank)  #
+#   to support                                                          #
+#########################################################################
+def count_range(oriented, first, last, support):
+    offsets = oriented.offsets
+    adj = oriented.adj
+    eid = oriented.eid
+    for u in xrange(first, last):
+        u_end = offsets[u + 1]
+        for i in xrange(offsets[u], u_end):
+            v = adj[i]
+            # out(u) is sorted, so only entries after v can be above v in rank
+            for a, b in intersection(adj, i + 1, u_end, offsets[v], offsets[v + 1]):
+                support[eid[i]] += 1
+                support[eid[a]] += 1
+                support[eid[b]] += 1
+
+
+#########################################################################
+#   Get a NumPy view of a CSR buffer without copying it                 #
+#########################################################################
+def as_numpy(buf):
+    if isinstance(buf, array):
+        return numpy.frombuffer(buf, dtype=numpy.dtype(buf.typecode))
+    return numpy.asarray(buf)
+
+
+#########################################################################
+#   Vectorised support of a batch of edges given by the dense ids of    #
+#   their endpoints. The neighbour lists of both endpoints are gathered #
+#   as keys (batch position, neighbour), and the common keys are        #
+#   counted per position. It needs NumPy.                               #
+#########################################################################
+def batch_support(csr, src, dst):
+    offsets = as_numpy(csr.offsets)
+    adj = as_numpy(csr.adj)
+    src = numpy.asarray(src, dtype=numpy.int64)
+    dst = numpy.asarray(dst, dtype=numpy.int64)
+    n = max(csr.num_vertices, 1)
+
+    def gather(vertices):
+        starts = offsets[vertices].astype(numpy.int64)
+        lengths = offsets[vertices + 1] - starts
+        total = int(lengths.sum())
+        owner = numpy.repeat(numpy.arange(len(vertices), dtype=numpy.int64), lengths)
+        # Position of each gathered entry inside its own neighbour list
+        first = numpy.cumsum(lengths) - lengths
+        positions = numpy.arange(total, dtype=numpy.int64) - numpy.repeat(first, lengths) + numpy.repeat(starts, lengths)
+        return owner * n + adj[positions].astype(numpy.int64), owner
+
+    keys_u, owner_u = gather(src)
+    keys_v, owner_v = gather(dst)
+    common = numpy.in1d(keys_u, keys_v, assume_unique=True)
+    return numpy.bincount(owner_u[common], minlength=len(src))
+
+
+#########################################################################
+#   Counts the support of all edges with the vectorised path, in        #
+#   batches of edges whose neighbour lists fit in BATCH_SIZE entries    #
+#########################################################################
+def edge_support_numpy(csr):
+    csr.build_edge_ids()
+    offsets = as_numpy(csr.offsets)
+    src = as_numpy(csr.edge_src).astype(numpy.int64)
+    dst = as_numpy(csr.edge_dst).astype(numpy.int64)
+    work = numpy.cumsum(offsets[src + 1] - offsets[src] + offsets[dst + 1] - offsets[dst])
+    support = numpy.zeros(csr.num_edges, dtype=numpy.int64)
+    first = 0
+    while first < csr.num_edges:
+        done = work[first - 1] if first > 0 else 0
+        last = max(int(numpy.searchsorted(work, done + BATCH_SIZE, side='right')), first + 1)
+        support[first:last] = batch_support(csr, src[first:last], dst[first:last])
+        first = last
+    return array('l', support.tolist())
+
+
+#########################################################################
+#   An oriented graph whose arrays are in shared memory (RawArray)      #
+#########################################################################
+class SharedOrientedGraph:
+
+    #########################################################################
+    #   Copy the arrays of an oriented graph into shared memory             #
+    #########################################################################
+    def __init__(self, oriented, num_edges):
+        self.num_vertices = oriented.num_vertices
+        self.num_edges = num_edges
+        self.offsets = to_shared(oriented.offsets)
+        self.adj = to_shared(oriented.adj)
+        self.eid = to_shared(oriented.eid)
+
+
+#########################################################################
+#   Copy an array into a shared RawArray of the same type               #
+#########################################################################
+def to_shared(buf):
+    shared = sharedctypes.RawArray(buf.typecode, len(buf))
+    if len(buf) > 0:
+        ctypes.memmove(shared, buf.buffer_info()[0], len(buf) * buf.itemsize)
+    return shared
+
+
+#########################################################################
+#   Worker: counts the triangles seen from a range of vertices of the   #
+#   shared graph. Only the edges the range touches are counted, in a    #
+#   dictionary, and they are returned as two strings of parallel arrays #
+#   of edge ids and counts, so no chunk sends a support of every edge.  #
+#########################################################################
+def count_chunk(chunk):
+    first, last = chunk
+    support = defaultdict(int)
+    count_range(shared_graph, first, last, support)
+    edges = array('l', support.iterkeys())
+    counts = array('l', support.itervalues())
+    return edges.tostring(), counts.tostring()
+
+
+#########################################################################
+#   Splits the vertices (in rank) into ranges of about the same work;   #
+#   the work of u is estimated by the square of its out-degree          #
+#########################################################################
+def split_work(oriented, num_chunks):
+    offsets = oriented.offsets
+    total = 0
+    for u in xrange(oriented.num_vertices):
+        total += (offsets[u + 1] - offsets[u]) ** 2
+    chunks = []
+    first = 0
+    work = 0
+    for u in xrange(oriented.num_vertices):
+        work += (offsets[u + 1] - offsets[u]) ** 2
+        if work * num_chunks >= total * (len(chunks) + 1):
+            chunks.append((first, u + 1))
+            first = u + 1
+    if first < oriented.num_vertices:
+        chunks.append((first, oriented.num_vertices))
+    return chunks
+
+
+#########################################################################
+#   Same as edge_support, but the oriented edges are split across a     #
+#   pool of processes. The workers read the graph from shared memory    #
+#   and send back the counts of the edges they touched, which are added #
+#   to one support array as they arrive.                                #
+#########################################################################
+def edge_support_parallel(csr, processes=None, oriented=None):
+    global shared_graph
+    if oriented is None:
+        oriented = OrientedGraph(csr)
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if processes <= 1 or oriented.num_vertices == 0:
+        return edge_support(csr, oriented)
+
+    shared_graph = SharedOrientedGraph(oriented, csr.num_edges)
+    chunks = split_work(oriented, processes * CHUNKS_PER_PROCESS)
+    pool = multiprocessing.Pool(processes)
+    try:
+        support = array('l', [0]) * csr.num_edges
+        if numpy is not None:
+            total = numpy.frombuffer(support, dtype=numpy.dtype('l'))
+            for edges, counts in pool.imap_unordered(count_chunk, chunks):
+                # The edge ids of a chunk are distinct
+                total[numpy.frombuffer(edges, dtype=numpy.dtype('l'))] += numpy.frombuffer(counts, dtype=numpy.dtype('l'))
+        else:
+            for edges, counts in pool.imap_unordered(count_chunk, chunks):
+                partial_edges = array('l')
+                partial_edges.fromstring(edges)
+                partial_counts = array('l')
+                partial_counts.fromstring(counts)
+                for i in xrange(len(partial_edges)):
+                    support[partial_edges[i]] += partial_counts[i]
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+        shared_graph = None
+    return support